@@ -0,0 +1,97 @@
+"""
+Micro-benchmark of bearer token decoding, with and without the decoded token cache.
+
+    python -m benchmarks.jwt_decode --iterations 20000
+
+Asymmetric algorithms need the `cryptography` package, they are skipped when it is missing.
+"""
+from datetime import datetime, timedelta
+from uuid import uuid4
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///benchmark.db")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+import jwt
+
+from src.auth.utils import DecodedTokenCache
+
+
+def _keys(algorithm: str):
+    if algorithm.startswith("HS"):
+        return "benchmark-secret" * 4, "benchmark-secret" * 4
+    
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    
+    if algorithm.startswith("RS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm.startswith("ES"):
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private_pem, public_pem
+
+
+def bench(algorithm: str, iterations: int) -> dict:
+    signing_key, verifying_key = _keys(algorithm)
+    token = jwt.encode(
+        {
+            "user": {"email": "bench@test.com", "user_uid": str(uuid4()), "role": "user"},
+            "exp": datetime.now() + timedelta(hours=1),
+            "jti": str(uuid4()),
+            "refresh": False,
+        },
+        key=signing_key,
+        algorithm=algorithm
+    )
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        jwt.decode(token, key=verifying_key, algorithms=[algorithm])
+    uncached = time.perf_counter() - start
+    
+    cache = DecodedTokenCache(max_size=1024)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        claims = cache.get(token)
+        if claims is None:
+            cache.set(token, jwt.decode(token, key=verifying_key, algorithms=[algorithm]))
+    cached = time.perf_counter() - start
+    
+    return {
+        "algorithm": algorithm,
+        "iterations": iterations,
+        "uncached_us_per_op": uncached / iterations * 1e6,
+        "cached_us_per_op": cached / iterations * 1e6,
+        "speedup": uncached / cached if cached else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--algorithms", nargs="+", default=["HS256", "RS256", "ES256", "EdDSA"])
+    args = parser.parse_args()
+    
+    results = []
+    for algorithm in args.algorithms:
+        try:
+            results.append(bench(algorithm, args.iterations))
+        except ImportError:
+            results.append({"algorithm": algorithm, "skipped": "cryptography is not installed"})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Load test of the auth -> books -> reviews request paths, driven in process through the ASGI app.
+
+    python -m benchmarks.load_test --fakeredis --mix mixed --duration 30 --concurrency 32 --out run.json
+    python -m benchmarks.load_test --fakeredis --mix mixed --baseline baseline.json --out run.json
+
+Runs against `DATABASE_URL` (a local SQLite file by default, or a Postgres stand-in) and the Redis
+in `REDIS_HOST`, or an in-memory fakeredis with `--fakeredis`. The dataset is topped up first:
+`--users` accounts, `--books` books cycled from `books_data.py`, `--reviews` reviews with their
+rating summaries. Then `--concurrency` virtual users each log in and issue requests drawn from
+the weighted `--mix` until `--duration` seconds have elapsed.
+
+The report has RPS, p50/p95/p99 latency, error count and SQL statements per request for each
+route. It is written as JSON with `--out`. With `--baseline`, any route whose p95 or queries per
+request grew, or whose RPS dropped, by more than `--tolerance` is a regression, and the exit code
+is 1.
+
+Rate limiting is disabled unless `RATE_LIMIT_ENABLED` is set, so login storms measure bcrypt and
+the database rather than 429s. `--no-blocklist-mirror` stops the in-process token blocklist
+mirror once the app has started, so every revocation check goes to Redis.
+"""
+from contextvars import ContextVar
+from datetime import datetime, date
+from uuid import uuid4
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///benchmark.db")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+PASSWORD = "benchmark-password"
+
+# Weighted request mixes, see the `Scenario` methods for what each operation sends.
+MIXES = {
+    "login_storm": {"login": 1},
+    "read": {"list_books": 35, "book_detail": 40, "reviews_page": 20, "me": 5},
+    "write": {"create_review": 60, "create_book": 20, "book_detail": 20},
+    "mixed": {"login": 5, "list_books": 25, "book_detail": 30, "reviews_page": 15, "create_review": 15, "me": 10},
+}
+
+_request_queries: ContextVar[list] = ContextVar("benchmark_request_queries")
+
+
+def install_fakeredis():
+    """ Points every `redis.asyncio` client created afterwards at one shared in-memory server. """
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("--fakeredis needs the `fakeredis` package (and `lupa` for the Lua scripts).")
+    import redis.asyncio as aioredis
+
+    server = fakeredis.FakeServer()
+
+    class FakeStrictRedis(fakeredis.FakeAsyncRedis):
+        def __init__(self, *args, db: int = 0, connection_pool=None, **kwargs):
+            if connection_pool is not None:
+                db = connection_pool.connection_kwargs.get("db", db)
+            super().__init__(server=server, db=db)
+
+    aioredis.StrictRedis = FakeStrictRedis
+    aioredis.Redis = FakeStrictRedis
+
+
+def count_queries(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _request_queries.get(None)
+        if counter is not None:
+            counter[0] += 1
+
+
+async def seed(users: int, books: int, reviews: int) -> dict:
+    """ Tops the database up to the requested dataset size, existing rows are reused. """
+    from sqlalchemy import Integer, func, insert, select
+    from src.auth.utils import get_password_hash
+    from src.books.books_data import books as sample_books
+    from src.db.db_agent import async_session_maker, dialect_insert
+    from src.db.models import User, Books, Reviews, BookRatingSummary, ROLES
+
+    async with async_session_maker() as session:
+        password_hash = get_password_hash(PASSWORD)
+        now = datetime.now()
+        user_rows = [
+            {
+                "uid": uuid4(), "username": f"bench{i}", "email": f"bench{i}@load.test", "first_name": "Bench",
+                "last_name": str(i), "role": ROLES.USER.value, "is_verified": True, "password_hash": password_hash,
+                "created_at": now, "updated_at": now,
+            }
+            for i in range(users)
+        ]
+        await session.execute(dialect_insert(session)(User.__table__).on_conflict_do_nothing(), user_rows)
+        user_uids = (await session.scalars(
+            select(User.uid).where(User.email.in_([row["email"] for row in user_rows]))
+        )).all()
+
+        missing_books = books - await session.scalar(select(func.count()).select_from(Books))
+        if missing_books > 0:
+            rows = []
+            for i in range(missing_books):
+                sample = sample_books[i % len(sample_books)]
+                rows.append({
+                    "uid": uuid4(), "title": f"{sample['title']} {i}", "author": sample["author"],
+                    "publisher": sample["publisher"], "published_date": date.fromisoformat(sample["published_date"]),
+                    "page_count": sample["page_count"], "language": sample["language"], "version": 1,
+                    "user_uid": random.choice(user_uids), "created_at": now, "updated_at": now,
+                })
+            await session.execute(insert(Books.__table__), rows)
+        book_uids = (await session.scalars(select(Books.uid).limit(books))).all()
+
+        missing_reviews = reviews - await session.scalar(select(func.count()).select_from(Reviews))
+        if missing_reviews > 0:
+            await session.execute(insert(Reviews.__table__), [
+                {
+                    "uid": uuid4(), "rating": random.randint(0, 5), "review_text": "Benchmark review",
+                    "user_uid": random.choice(user_uids), "book_uid": random.choice(book_uids),
+                    "created_at": now, "updated_at": now,
+                }
+                for _ in range(missing_reviews)
+            ])
+            # Rebuild the rating summaries from the reviews.
+            summary = BookRatingSummary.__table__
+            statement = dialect_insert(session)(summary).from_select(
+                ["book_uid", "review_count", "rating_sum", *[f"rating_{rating}" for rating in range(6)]],
+                select(
+                    Reviews.book_uid, func.count(), func.sum(Reviews.rating),
+                    *[func.sum((Reviews.rating == rating).cast(Integer)) for rating in range(6)]
+                ).where(Reviews.book_uid.is_not(None)).group_by(Reviews.book_uid)
+            )
+            await session.execute(statement.on_conflict_do_update(
+                index_elements=[summary.c.book_uid],
+                set_={column.name: statement.excluded[column.name] for column in summary.c if column.name != "book_uid"}
+            ))
+
+        await session.commit()
+        review_count = await session.scalar(select(func.count()).select_from(Reviews))
+    return {"users": len(user_uids), "books": len(book_uids), "reviews": review_count}
+
+
+class Scenario:
+    """ One virtual user: logs in once, then issues the operations of the mix. """
+
+    def __init__(self, client, email: str, book_uids: list):
+        self.client = client
+        self.email = email
+        self.book_uids = book_uids
+        self.headers = {}
+        self.cursor = None
+
+    async def authenticate(self):
+        response = await self.client.post("/api/v1/auth/login", json={"email": self.email, "password": PASSWORD})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def login(self):
+        return "POST /auth/login", await self.client.post(
+            "/api/v1/auth/login", json={"email": self.email, "password": PASSWORD}
+        )
+
+    async def list_books(self):
+        params = {"limit": 50, **({"cursor": self.cursor} if self.cursor else {})}
+        response = await self.client.get("/api/v1/books/", params=params, headers=self.headers)
+        if response.status_code == 200:
+            # Page through the catalogue, starting over at the end.
+            self.cursor = response.json().get("next_cursor")
+        return "GET /books/", response
+
+    async def book_detail(self):
+        book_uid = random.choice(self.book_uids)
+        return "GET /books/{book_id}", await self.client.get(
+            f"/api/v1/books/{book_uid}", params={"include_reviews": "false"}, headers=self.headers
+        )
+
+    async def reviews_page(self):
+        book_uid = random.choice(self.book_uids)
+        return "GET /reviews/book/{book_uid}", await self.client.get(
+            f"/api/v1/reviews/book/{book_uid}", params={"limit": 20}, headers=self.headers
+        )
+
+    async def create_review(self):
+        book_uid = random.choice(self.book_uids)
+        return "POST /reviews/book/{book_uid}", await self.client.post(
+            f"/api/v1/reviews/book/{book_uid}",
+            json={"rating": random.randint(0, 5), "review_text": "Load test review"}, headers=self.headers
+        )
+
+    async def create_book(self):
+        return "POST /books/", await self.client.post("/api/v1/books/", json={
+            "title": f"Load test {uuid4().hex[:8]}", "author": "Bench", "publisher": "Bench Press",
+            "published_date": "2024-01-01", "page_count": 100, "language": "English",
+        }, headers=self.headers)
+
+    async def me(self):
+        return "GET /auth/me", await self.client.get("/api/v1/auth/me", headers=self.headers)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    routes = {}
+    for route, entries in sorted(samples.items()):
+        latencies = sorted(latency for latency, _, _ in entries)
+        routes[route] = {
+            "requests": len(entries),
+            "rps": round(len(entries) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "max_ms": round(latencies[-1], 3),
+            "errors": sum(1 for _, status, _ in entries if status >= 400),
+            "queries_per_request": round(sum(queries for _, _, queries in entries) / len(entries), 2),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {"total_requests": total, "total_rps": round(total / elapsed, 2), "routes": routes}
+
+
+async def run(args) -> dict:
+    import httpx
+    from src import app
+    from src.db.db_agent import async_engine
+    from src.db.db_agent import async_session_maker
+    from src.db.models import Books
+    from src.db.redis import blocklist_mirror
+    from sqlalchemy import select
+
+    count_queries(async_engine)
+    async with app.router.lifespan_context(app):
+        if args.no_blocklist_mirror:
+            await blocklist_mirror.stop()
+        dataset = await seed(args.users, args.books, args.reviews)
+        async with async_session_maker() as session:
+            book_uids = [str(uid) for uid in (await session.scalars(select(Books.uid).limit(args.books))).all()]
+
+        transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            scenarios = [
+                Scenario(client, f"bench{i % args.users}@load.test", book_uids) for i in range(args.concurrency)
+            ]
+            await asyncio.gather(*[scenario.authenticate() for scenario in scenarios])
+
+            operations, weights = zip(*MIXES[args.mix].items())
+            samples: dict = {}
+            deadline = time.perf_counter() + args.duration
+
+            async def virtual_user(scenario: Scenario):
+                while time.perf_counter() < deadline:
+                    operation = random.choices(operations, weights)[0]
+                    counter = [0]
+                    token = _request_queries.set(counter)
+                    start = time.perf_counter()
+                    try:
+                        route, response = await getattr(scenario, operation)()
+                    finally:
+                        _request_queries.reset(token)
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    samples.setdefault(route, []).append((elapsed_ms, response.status_code, counter[0]))
+
+            start = time.perf_counter()
+            await asyncio.gather(*[virtual_user(scenario) for scenario in scenarios])
+            elapsed = time.perf_counter() - start
+
+    await async_engine.dispose()
+    return {
+        "meta": {
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 3),
+            "database": async_engine.dialect.name,
+            "redis": "fakeredis" if args.fakeredis else os.environ.get("REDIS_HOST", "redis"),
+            "blocklist_mirror": not args.no_blocklist_mirror,
+            "dataset": dataset,
+            "python": platform.python_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        **summarize(samples, elapsed),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """ Regressions of `result` against `baseline`, per route. """
+    regressions = []
+    for route, current in result["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: rps {previous['rps']} -> {current['rps']}")
+        if current["queries_per_request"] > previous["queries_per_request"] * (1 + tolerance):
+            regressions.append(
+                f"{route}: queries/request {previous['queries_per_request']} -> {current['queries_per_request']}"
+            )
+    return regressions
+
+
+def print_report(result: dict):
+    print(f"{'route':<32}{'req':>8}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'err':>6}{'q/req':>7}")
+    for route, stats in result["routes"].items():
+        print(
+            f"{route:<32}{stats['requests']:>8}{stats['rps']:>10}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>6}{stats['queries_per_request']:>7}"
+        )
+    print(f"total: {result['total_requests']} requests, {result['total_rps']} rps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=10000)
+    parser.add_argument("--fakeredis", action="store_true", help="Use an in-memory Redis instead of REDIS_HOST.")
+    parser.add_argument(
+        "--no-blocklist-mirror", action="store_true", help="Check every token against Redis, as while the mirror is not ready."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the request mix.")
+    parser.add_argument("--out", help="Write the JSON report to this file.")
+    parser.add_argument("--baseline", help="JSON report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.fakeredis:
+        install_fakeredis()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(result, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(result, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Latency benchmark of `BookService.search_books` against the database in `DATABASE_URL`.
+
+    python -m benchmarks.search_latency --seed 3000000 --queries 500
+
+`--seed N` first tops the `books` table up to N rows of synthetic titles (generated server
+side with `generate_series`), the search queries then mix full words, prefixes and typos.
+`--query` (repeatable) times the given queries instead, e.g. `--query a --query p` for the
+broad prefixes that match most of the table.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from src.books.services import BookService
+from src.db.db_agent import async_engine, async_session_maker
+
+
+WORDS = [
+    "fastapi", "python", "cloud", "data", "science", "guide", "network", "security", "design",
+    "patterns", "systems", "learning", "deploy", "analyze", "press", "works", "basics", "advanced",
+]
+
+QUERIES = ["fastapi", "pyth", "clud basics", "data sci", "security guide", "netwrk", "deploy", "adv pat"]
+
+
+async def seed(rows: int):
+    async with async_engine.begin() as conn:
+        existing = (await conn.execute(text("SELECT count(*) FROM books"))).scalar_one()
+        missing = rows - existing
+        if missing <= 0:
+            return
+        words = "ARRAY[" + ",".join(f"'{word}'" for word in WORDS) + "]"
+        await conn.execute(text(f"""
+            INSERT INTO books (uid, title, author, publisher, published_date, page_count, language, created_at, updated_at)
+            SELECT
+                gen_random_uuid(),
+                initcap(({words})[1 + (i * 7) % {len(WORDS)}] || ' ' || ({words})[1 + (i * 13) % {len(WORDS)}] || ' ' || i),
+                'Author ' || ({words})[1 + (i * 3) % {len(WORDS)}],
+                initcap(({words})[1 + (i * 5) % {len(WORDS)}]) || ' Press',
+                date '2000-01-01' + (i % 9000),
+                100 + i % 900,
+                'English',
+                now() - (i || ' seconds')::interval,
+                now()
+            FROM generate_series(1, :missing) AS i
+        """), {"missing": missing})
+        await conn.execute(text("ANALYZE books"))
+
+
+async def run(queries: int, limit: int, pool: list) -> dict:
+    service = BookService()
+    timings = []
+    async with async_session_maker() as session:
+        for _ in range(queries):
+            query = random.choice(pool)
+            start = time.perf_counter()
+            await service.search_books(query, session=session, limit=limit)
+            timings.append((time.perf_counter() - start) * 1000)
+    
+    timings.sort()
+    return {
+        "queries": queries,
+        "limit": limit,
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+        "max_ms": timings[-1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--query", action="append", help="Query to time, instead of the built-in mix.")
+    args = parser.parse_args()
+    
+    if args.seed:
+        await seed(args.seed)
+    print(json.dumps(await run(args.queries, args.limit, args.query or QUERIES), indent=2))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Compares the response serialization paths on 1k row pages of the list and detail shapes.
+
+    python -m benchmarks.serialization --rows 1000 --rounds 20
+
+* `fastapi`: what `response_model=...` does, validate from attributes, dump to python, `json.dumps`.
+* `type_adapter`: cached `TypeAdapter`, validate from attributes and `dump_json` in pydantic-core.
+* `fast`: `to_plain` straight from the objects and `orjson`, no re-validation.
+"""
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+from uuid import uuid4
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///benchmark.db")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+from src.auth.schemas import UserBooksModel
+from src.books.schemas import BooksModel, BookDetailModel
+from src.utils import serialization
+from src.utils.config import settings
+
+
+def _review(book_uid, index: int):
+    now = datetime.now()
+    return SimpleNamespace(
+        uid=uuid4(), rating=index % 6, review_text=f"Review number {index} " * 4,
+        user_uid=uuid4(), book_uid=book_uid, created_at=now, updated_at=now
+    )
+
+
+def _book(index: int, reviews: int = 0):
+    now = datetime.now() - timedelta(seconds=index)
+    uid = uuid4()
+    return SimpleNamespace(
+        uid=uid, title=f"Book {index}", author=f"Author {index % 50}", publisher="Tech Press",
+        published_date=date(2020, 1, 1) + timedelta(days=index % 1000), page_count=100 + index,
+        language="English", version=1, created_at=now, updated_at=now,
+        reviews=[_review(uid, i) for i in range(reviews)], rating_summary=None
+    )
+
+
+def _user(books: List, reviews: List):
+    now = datetime.now()
+    return SimpleNamespace(
+        uid=uuid4(), username="bench", email="bench@test.com", first_name="Bench", last_name="Mark",
+        is_verified=True, password_hash="x", created_at=now, updated_at=now, books=books, reviews=reviews
+    )
+
+
+def _fastapi_path(model, objs) -> bytes:
+    adapter = serialization.type_adapter(List[model])
+    return json.dumps(adapter.dump_python(adapter.validate_python(objs, from_attributes=True), mode="json")).encode()
+
+
+def _time(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    
+    books = [_book(i) for i in range(args.rows)]
+    shapes = {
+        "BooksModel": (BooksModel, books),
+        "BookDetailModel": (BookDetailModel, [_book(i, reviews=20) for i in range(args.rows // 10)]),
+        "UserBooksModel": (UserBooksModel, [_user(books[:100], [_review(uuid4(), i) for i in range(100)]) for _ in range(10)]),
+    }
+    
+    results = {}
+    for name, (model, objs) in shapes.items():
+        settings.FAST_JSON_RESPONSES = False
+        baseline = _time(lambda: _fastapi_path(model, objs), args.rounds)
+        adapter = _time(lambda: serialization.dump_list(model, objs), args.rounds)
+        settings.FAST_JSON_RESPONSES = True
+        fast = _time(lambda: serialization.dump_list(model, objs), args.rounds) if serialization.orjson else None
+        results[name] = {
+            "objects": len(objs),
+            "fastapi_ms": baseline,
+            "type_adapter_ms": adapter,
+            "fast_ms": fast,
+            "speedup": baseline / fast if fast else None,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
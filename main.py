@@ -0,0 +1,53 @@
+"""
+Production entry point: `WEB_WORKERS` uvicorn worker processes (the CPU count by default) on
+uvloop and httptools.
+
+    python main.py --host 0.0.0.0 --port 8000 --workers 4
+
+Each worker warms its database and Redis pools, the bcrypt threads and the JWT path before it
+accepts traffic, then logs its startup time and memory ("Worker ready"), also exported as the
+`worker` metrics. On SIGTERM workers stop accepting connections, let in-flight requests finish for
+up to `SHUTDOWN_GRACE_SECONDS`, then dispose the engines and Redis clients.
+"""
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+from src.utils.config import settings
+
+
+def default_workers() -> int:
+    if settings.WEB_WORKERS > 0:
+        return settings.WEB_WORKERS
+    # The CPUs this process may run on, which respects container cpusets.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args()
+    
+    uvicorn.run(
+        "src:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
+        http="httptools" if importlib.util.find_spec("httptools") else "auto",
+        lifespan="on",
+        timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_SECONDS,
+        # TelemetryMiddleware writes the (sampled) access log.
+        access_log=False,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
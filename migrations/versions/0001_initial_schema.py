@@ -0,0 +1,79 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+Baseline of the tables previously created by `init_db()`. Databases that were
+bootstrapped through `SQLModel.metadata.create_all` should be stamped with
+`alembic stamp 0001` before running `alembic upgrade head`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('uid', postgresql.UUID(), nullable=False),
+        sa.Column('username', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('first_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('last_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('role', postgresql.VARCHAR(), server_default='user', nullable=False),
+        sa.Column('is_verified', sa.Boolean(), nullable=False),
+        sa.Column('password_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('uid')
+    )
+    op.create_table(
+        'books',
+        sa.Column('uid', postgresql.UUID(), nullable=False),
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('author', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('publisher', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('published_date', sa.Date(), nullable=False),
+        sa.Column('page_count', sa.Integer(), nullable=False),
+        sa.Column('language', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('user_uid', sa.Uuid(), nullable=True),
+        sa.Column('created_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['user_uid'], ['users.uid'], ),
+        sa.PrimaryKeyConstraint('uid'),
+        sa.UniqueConstraint('uid')
+    )
+    op.create_table(
+        'reviews',
+        sa.Column('uid', postgresql.UUID(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('review_text', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('user_uid', sa.Uuid(), nullable=True),
+        sa.Column('book_uid', sa.Uuid(), nullable=True),
+        sa.Column('created_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', postgresql.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['book_uid'], ['books.uid'], ),
+        sa.ForeignKeyConstraint(['user_uid'], ['users.uid'], ),
+        sa.PrimaryKeyConstraint('uid'),
+        sa.UniqueConstraint('uid')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reviews')
+    op.drop_table('books')
+    op.drop_table('users')
@@ -0,0 +1,42 @@
+"""books pagination indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+Composite indexes backing the keyset pagination of `/books/` and
+`/books/user/{user_uid}`, both ordered by `(created_at DESC, uid DESC)`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_books_created_at_uid', 'books', ['created_at', 'uid'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_books_user_uid_created_at', 'books', ['user_uid', 'created_at', 'uid'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_user_uid_created_at', table_name='books', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_books_created_at_uid', table_name='books', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,61 @@
+"""book rating summaries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+Per book review aggregates (count, sum and 0-5 histogram) so clients showing an
+average rating read one small row instead of every review. Backfilled from the
+existing reviews.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'book_rating_summaries',
+        sa.Column('book_uid', postgresql.UUID(), nullable=False),
+        sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False),
+        *[sa.Column(f'rating_{rating}', sa.Integer(), server_default='0', nullable=False) for rating in range(6)],
+        sa.ForeignKeyConstraint(['book_uid'], ['books.uid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_uid')
+    )
+    op.execute(
+        """
+        INSERT INTO book_rating_summaries
+            (book_uid, review_count, rating_sum, rating_0, rating_1, rating_2, rating_3, rating_4, rating_5)
+        SELECT
+            book_uid,
+            count(*),
+            sum(rating),
+            count(*) FILTER (WHERE rating = 0),
+            count(*) FILTER (WHERE rating = 1),
+            count(*) FILTER (WHERE rating = 2),
+            count(*) FILTER (WHERE rating = 3),
+            count(*) FILTER (WHERE rating = 4),
+            count(*) FILTER (WHERE rating = 5)
+        FROM reviews
+        WHERE book_uid IS NOT NULL
+        GROUP BY book_uid
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('book_rating_summaries')
@@ -0,0 +1,42 @@
+"""reviews pagination indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+Composite indexes backing the keyset pagination of `/reviews/book/{book_uid}`,
+ordered by `(rating, created_at, uid)` or by `(created_at, uid)`, all descending.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_reviews_book_uid_rating_created_at_uid', 'reviews', ['book_uid', 'rating', 'created_at', 'uid'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_reviews_book_uid_created_at_uid', 'reviews', ['book_uid', 'created_at', 'uid'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_book_uid_created_at_uid', table_name='reviews', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_reviews_book_uid_rating_created_at_uid', table_name='reviews', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,60 @@
+"""books full-text and trigram search
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+Generated, weighted `tsvector` over title/author/publisher with a GIN index, and
+`pg_trgm` GIN indexes on title/author for typo tolerant matching in `/books/search`.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        'books',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')",
+                persisted=True
+            ),
+            nullable=True
+        )
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_books_search_vector', 'books', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_books_title_author_trgm', 'books', ['title', 'author'],
+            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops', 'author': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_books_title_author_trgm', table_name='books', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_books_search_vector', table_name='books', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('books', 'search_vector')
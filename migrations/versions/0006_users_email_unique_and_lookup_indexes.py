@@ -0,0 +1,50 @@
+"""unique users email and lookup indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+Unique, case-normalized index on `users.email` backing login/signup lookups and the
+`ON CONFLICT DO NOTHING` signup, and an index on `reviews.user_uid`.
+
+Index audit of the other lookup columns:
+* `books.user_uid`: leading column of `ix_books_user_uid_created_at` (0002).
+* `reviews.book_uid`: leading column of both review pagination indexes (0004).
+
+Case-insensitive duplicate emails must be merged before upgrading, otherwise the
+unique index build fails:
+    SELECT lower(email), count(*) FROM users GROUP BY 1 HAVING count(*) > 1;
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_users_email_lower', 'users', [sa.text('lower(email)')], unique=True,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_reviews_user_uid', 'reviews', ['user_uid'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_user_uid', table_name='reviews', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ux_users_email_lower', table_name='users', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,48 @@
+"""books row version
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00.000000
+
+Row version for optimistic concurrency on book writes (`If-Match` on PATCH/DELETE).
+Adding a column with a constant default does not rewrite the table.
+
+`reviews.book_uid` now sets itself to NULL on book delete. The ORM used to do
+this by loading every review before the delete; now a single
+`DELETE ... RETURNING` statement is enough. Swapping the constraint takes an
+ACCESS EXCLUSIVE lock on reviews, so it is re-added NOT VALID (no scan) and the
+migration transaction commits before `VALIDATE CONSTRAINT` scans the table in its
+own transaction, which only takes SHARE UPDATE EXCLUSIVE and lets writes through.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.drop_constraint('reviews_book_uid_fkey', 'reviews', type_='foreignkey')
+    op.execute(
+        "ALTER TABLE reviews ADD CONSTRAINT reviews_book_uid_fkey "
+        "FOREIGN KEY (book_uid) REFERENCES books (uid) ON DELETE SET NULL NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE reviews VALIDATE CONSTRAINT reviews_book_uid_fkey")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('reviews_book_uid_fkey', 'reviews', type_='foreignkey')
+    op.create_foreign_key('reviews_book_uid_fkey', 'reviews', 'books', ['book_uid'], ['uid'])
+    op.drop_column('books', 'version')
@@ -1,35 +1,93 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Query
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
+import logging
 
 from src.books.routes import book_route
 from src.auth.routers import auth_router
 from src.reviews.routers import review_router
-from src.db.db_agent import init_db
+from src.db.db_agent import init_db, close_db, pool_metrics
+from src.db.profiler import query_profiler
+from src.auth.dependencies import RoleChecker
+from src.db.models import ROLES
+from src.auth.utils import password_hasher, decoded_token_cache
+from src.auth.cache import principal_cache
+from src.db.redis import blocklist_mirror, close_redis, redis_stats
+from src.db.cache import response_cache
+from src.rate_limit import rate_limiter
 from src.middelware import register_middelware
+from src.exceptions import register_exception_handlers
+from src.metrics import registry
+from src.utils.config import settings
+from src.utils.log_config import setup_logging, shutdown_logging
+from src.lifecycle import warmup, worker_stats
+
+
+logger = logging.getLogger("secured_server")
 
 
 @asynccontextmanager
 async def life_span(app: FastAPI):
-    print("Server Started .....")
+    setup_logging(settings.LOG_LEVEL)
+    logger.info("Server Started .....")
     await init_db()
+    blocklist_mirror.start()
+    if settings.WARMUP_ENABLED:
+        await warmup()
+    worker_stats.ready()
+    logger.info("Worker ready", extra=worker_stats.stats())
     yield
-    print("Server Closed .....")
+    await blocklist_mirror.stop()
+    password_hasher.shutdown()
+    await close_db()
+    await close_redis()
+    logger.info("Server Closed .....")
+    shutdown_logging()
 
 version = "v1"
 
 app = FastAPI(
     title="Secure Media Server",
     summary="A FastAPI secured server to demo the backend functionality of a Social Media Application",
-    version=version
+    version=version,
+    lifespan=life_span
 )
 
 register_middelware(app)
+register_exception_handlers(app)
 
 app.include_router(router=book_route, prefix=f"/api/{version}/books", tags=["books"])
 app.include_router(router=auth_router, prefix=f"/api/{version}/auth", tags=["auth"])
 app.include_router(router=review_router, prefix=f"/api/{version}/reviews", tags=["reviews"])
 
+registry.register_collector("db_pool", pool_metrics)
+registry.register_collector("principal_cache", principal_cache.stats)
+registry.register_collector("jwt_cache", decoded_token_cache.stats)
+registry.register_collector("password_hasher", password_hasher.stats)
+registry.register_collector("token_blocklist", blocklist_mirror.stats)
+registry.register_collector("response_cache", response_cache.stats)
+registry.register_collector("rate_limit", rate_limiter.stats)
+registry.register_collector("redis", redis_stats)
+registry.register_collector("sql", query_profiler.stats)
+registry.register_collector("worker", worker_stats.stats)
+
 
 @app.get("/")
 async def main():
-    return {"message": "Welcome"}
\ No newline at end of file
+    return {"message": "Welcome"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+if settings.SQL_DEBUG_ENDPOINT:
+    
+    @app.get("/debug/sql", include_in_schema=False, dependencies=[Depends(RoleChecker([ROLES.ADMIN.value]))])
+    async def top_statements(n: int = Query(default=20, ge=1, le=200), reset: bool = False):
+        """ Statements of this worker ranked by total database time. """
+        top = query_profiler.top(n)
+        if reset:
+            query_profiler.reset()
+        return {"statements": top, **query_profiler.stats()}
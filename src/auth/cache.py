@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from typing import Optional
+import asyncio
+import logging
+import threading
+import time
+
+from src.auth.schemas import Principal
+from src.db.models import User
+from src.db.redis import REDIS_ERRORS, TOKEN_BLOCKLIST_DB, blocklist_mirror, circuit_breaker, get_redis
+from src.utils.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_EVICTIONS_CHANNEL = "principal_evictions"
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of authenticated principals with a per entry TTL, keyed by user uid. Evictions
+    are published once the change is committed, so every worker drops the stale principal.
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def get(self, user_uid: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_uid)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_uid]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_uid)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, user_uid: str, principal: Principal):
+        with self._lock:
+            self._entries[user_uid] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(user_uid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_uid: str):
+        with self._lock:
+            self._entries.pop(user_uid, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL
+)
+
+
+evictions_breaker = circuit_breaker("principal_evictions")
+_publishing: set[asyncio.Task] = set()
+
+
+async def publish_eviction(user_uid: str):
+    try:
+        await evictions_breaker.call(lambda: get_redis(TOKEN_BLOCKLIST_DB).publish(PRINCIPAL_EVICTIONS_CHANNEL, user_uid))
+    except REDIS_ERRORS as e:
+        # The other workers keep the principal until its TTL runs out.
+        logger.warning("Principal eviction of %s not published: %r", user_uid, e)
+
+
+def _on_eviction(user_uid: Optional[str]):
+    if user_uid is None:
+        principal_cache.clear()
+    else:
+        principal_cache.invalidate(user_uid)
+
+
+blocklist_mirror.on_channel(PRINCIPAL_EVICTIONS_CHANNEL, _on_eviction)
+
+
+def _evict(target: User):
+    user_uid = str(target.uid)
+    principal_cache.invalidate(user_uid)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("evicted_principals", set()).add(user_uid)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_principal_change(mapper, connection, target: User):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("email", "role", "is_verified")):
+        _evict(target)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target: User):
+    _evict(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_evictions(session: Session):
+    evicted = session.info.pop("evicted_principals", None)
+    if not evicted:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Synchronous scripts cannot publish, the other workers keep the principal until its TTL.
+        return
+    for user_uid in evicted:
+        # Again after the commit, a concurrent request may have cached the old row in between.
+        principal_cache.invalidate(user_uid)
+        task = loop.create_task(publish_eviction(user_uid))
+        _publishing.add(task)
+        task.add_done_callback(_publishing.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_evictions(session: Session):
+    session.info.pop("evicted_principals", None)
@@ -3,12 +3,17 @@ from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
+from uuid import UUID
 
-from src.auth.utils import decode_token
-from src.db.redis import get_token_in_blocklist
+from src.auth.utils import decode_token, decoded_token_cache
+from src.db.redis import get_token_in_blocklist, blocklist_mirror
 from src.auth.services import UserService
 from src.db.db_agent import get_session
-from src.db.models import User
+from src.auth.schemas import Principal
+from src.auth.cache import principal_cache
+
+
+blocklist_mirror.on_revoke(decoded_token_cache.evict_jti)
 
 
 def get_user_service():
@@ -22,16 +27,22 @@ class TokenBearer(HTTPBearer):
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials:
         creds = await super().__call__(request)
         
-        parsed_token = await decode_token(creds.credentials)
-        if (not parsed_token) or (not isinstance(parsed_token, dict)):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="Invalid/Expired token."
-            )
+        # Several bearer instances may guard the same route, decode and check the blocklist once per request.
+        memo = getattr(request.state, "parsed_token", None)
+        if memo and memo[0] == creds.credentials:
+            parsed_token = memo[1]
+        else:
+            parsed_token = decode_token(creds.credentials)
+            if (not parsed_token) or (not isinstance(parsed_token, dict)):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail="Invalid/Expired token."
+                )
 
-        if await get_token_in_blocklist(parsed_token.get("jti")):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked (Logout)."
-            )
+            if await get_token_in_blocklist(parsed_token.get("jti")):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked (Logout)."
+                )
+            request.state.parsed_token = (creds.credentials, parsed_token)
             
         await self.verify_token_data(parsed_token)
         return parsed_token
@@ -61,14 +72,28 @@ class RefreshTokenBearer(TokenBearer):
 
 
 async def get_current_auth_user(
+    request: Request,
     user_details: AccessTokenBearer = Depends(AccessTokenBearer()),
     user_service: UserService = Depends(get_user_service),
     session: AsyncSession = Depends(get_session)
-    ):
+    ) -> Principal:
+    
+    principal = getattr(request.state, "principal", None)
+    if principal:
+        return principal
+    
+    user_uid = user_details.get("user").get("user_uid")
+    principal = principal_cache.get(user_uid)
+    if not principal:
+        principal = await user_service.get_principal(UUID(user_uid), session)
+        if not principal:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found."
+            )
+        principal_cache.set(user_uid, principal)
     
-    email = user_details.get("user").get("email")
-    user_data = await user_service.get_user_by_email(email, session)
-    return user_data
+    request.state.principal = principal
+    return principal
 
 
 class RoleChecker:
@@ -76,7 +101,7 @@ class RoleChecker:
     def __init__(self, allowed_roles: List[str]):
         self.allowed_roles = allowed_roles
         
-    async def __call__(self, current_user_details: User = Depends(get_current_auth_user)):
+    async def __call__(self, current_user_details: Principal = Depends(get_current_auth_user)):
         if current_user_details.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 from datetime import datetime, timedelta
 
-from src.auth.schemas import UserBooksModel, UserLoginModel, UserModel, UserCreateModel
+from src.auth.schemas import UserBooksModel, UserLoginModel, UserModel, UserCreateModel, Principal
 from src.auth.services import UserService
-from src.db.db_agent import get_session
-from src.auth.utils import verify_password, create_access_token
+from src.db.db_agent import get_session, get_read_session
+from src.auth.utils import password_hasher, create_access_token
 from src.auth.dependencies import AccessTokenBearer, RefreshTokenBearer, get_current_auth_user, RoleChecker
 from src.db.redis import add_token_to_blocklist
-from src.db.models import User, ROLES
+from src.db.models import ROLES
+from src.utils.serialization import dump_list, dump_model
+from src.rate_limit import RateLimit
 
 
 auth_router = APIRouter()
@@ -26,28 +28,27 @@ role_checker = RoleChecker([ROLES.ADMIN.value, ROLES.USER.value])
 @auth_router.get("/users", response_model=List[UserModel], status_code=status.HTTP_200_OK)
 async def get_all_users(
     user_service: UserService = Depends(get_user_service),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
     ):
     users_data = await user_service.get_all_users(session)
-    return users_data
+    return Response(content=dump_list(UserModel, users_data), media_type="application/json")
 
 
-@auth_router.post("/signup", response_model=UserModel, status_code=status.HTTP_201_CREATED)
+@auth_router.post("/signup", response_model=UserModel, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimit("signup"))])
 async def create_user_account(
     user_data: UserCreateModel,
     user_service: UserService = Depends(get_user_service),
     session: AsyncSession = Depends(get_session)
     ):
     user_email = user_data.email
-    existing_user_data = await user_service.get_user_by_email(user_email, session)
-    if existing_user_data:
+    new_user_data = await user_service.create_user(user_data, session)
+    if not new_user_data:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"User with email - '{user_email}' already exists")
     
-    new_user_data = await user_service.create_user(user_data, session)
     return new_user_data
 
 
-@auth_router.post("/login")
+@auth_router.post("/login", dependencies=[Depends(RateLimit("login"))])
 async def create_user_session(
     user_data: UserLoginModel,
     user_service: UserService = Depends(get_user_service),
@@ -59,9 +60,13 @@ async def create_user_session(
     if not existing_user_data:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Please signup first!")
     
-    valid_password = verify_password(user_data.password, existing_user_data.password_hash)
+    valid_password, new_password_hash = await password_hasher.verify_and_update(
+        user_data.password, existing_user_data.password_hash
+    )
     if not valid_password:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid password!")
+    if new_password_hash:
+        await user_service.update_password_hash(existing_user_data, new_password_hash, session)
     
     user_data={
             "email": email,
@@ -104,11 +109,14 @@ async def refresh_access_token(user_details: dict = Depends(RefreshTokenBearer()
 
 
 @auth_router.get("/me", response_model=UserBooksModel)
-def get_current_user(
-    user: User = Depends(get_current_auth_user),
-    _: bool = Depends(role_checker)
+async def get_current_user(
+    user: Principal = Depends(get_current_auth_user),
+    _: bool = Depends(role_checker),
+    user_service: UserService = Depends(get_user_service),
+    session: AsyncSession = Depends(get_read_session)
     ):
-    return user
+    user_data = await user_service.get_user_by_uid(user.uid, session, with_relations=True)
+    return Response(content=dump_model(UserBooksModel, user_data), media_type="application/json")
 
 
 @auth_router.get("/logout")
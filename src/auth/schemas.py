@@ -35,6 +35,16 @@ class UserBooksModel(UserModel):
     reviews: List[ReviewModel]
 
 
+class Principal(BaseModel):
+    """ Slim view of the authenticated user, shared across requests through the principal cache. """
+    uid: UUID
+    email: str
+    role: str
+    is_verified: bool
+
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
+
 class UserLoginModel(BaseModel):
     email: str
     password: str
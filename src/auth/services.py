@@ -1,10 +1,14 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, desc
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from typing import List
+from uuid import UUID
 
-from src.auth.utils import get_password_hash, verify_password
+from src.auth.utils import password_hasher
 from src.db.models import User, ROLES
-from src.auth.schemas import UserCreateModel
+from src.db.db_agent import dialect_insert
+from src.auth.schemas import UserCreateModel, Principal
 
 
 
@@ -14,17 +18,48 @@ class UserService:
         result = await session.exec(statement)
         return result.all()
     
-    async def get_user_by_email(self, email: str, session: AsyncSession) -> User|None:
-        statement = select(User).where(User.email == email)
+    def _user_statement(self, with_relations: bool):
+        statement = select(User)
+        if with_relations:
+            statement = statement.options(selectinload(User.books), selectinload(User.reviews))
+        return statement
+    
+    async def get_user_by_email(self, email: str, session: AsyncSession, with_relations: bool = False) -> User|None:
+        statement = self._user_statement(with_relations).where(func.lower(User.email) == email.lower())
+        result = await session.exec(statement)
+        return result.first()
+    
+    async def get_user_by_uid(self, user_uid: UUID, session: AsyncSession, with_relations: bool = False) -> User|None:
+        statement = self._user_statement(with_relations).where(User.uid == user_uid)
         result = await session.exec(statement)
         return result.first()
     
-    async def create_user(self, user_data: UserCreateModel, session: AsyncSession) -> User|None:
+    async def get_principal(self, user_uid: UUID, session: AsyncSession) -> Principal|None:
+        statement = select(User.uid, User.email, User.role, User.is_verified).where(User.uid == user_uid)
+        result = await session.exec(statement)
+        row = result.first()
+        return Principal.model_validate(row._mapping) if row else None
+    
+    async def create_user(self, user_data: UserCreateModel, session: AsyncSession) -> dict|None:
+        """
+        Single round-trip signup, `INSERT ... ON CONFLICT DO NOTHING RETURNING` against the unique
+        `lower(email)` index. Returns `None` when the email is already registered.
+        """
         user_data_dict = user_data.model_dump()
-        user_data_dict["password_hash"] = get_password_hash(user_data_dict["password"])
+        user_data_dict["password_hash"] = await password_hasher.hash(user_data_dict["password"])
         del user_data_dict["password"]
-        new_user_data = User(**user_data_dict)
-        new_user_data.role = ROLES.USER.value
-        session.add(new_user_data)
+        user_data_dict["email"] = user_data_dict["email"].lower()
+        user_data_dict["role"] = ROLES.USER.value
+        user_data_dict["is_verified"] = False
+        
+        table = User.__table__
+        statement = dialect_insert(session)(table).values(**user_data_dict).on_conflict_do_nothing().returning(*table.c)
+        result = await session.execute(statement)
+        new_user_data = result.mappings().first()
+        await session.commit()
+        return dict(new_user_data) if new_user_data else None
+    
+    async def update_password_hash(self, user: User, password_hash: str, session: AsyncSession):
+        user.password_hash = password_hash
         await session.commit()
-        return new_user_data
\ No newline at end of file
+        return user
\ No newline at end of file
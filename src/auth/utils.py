@@ -1,14 +1,26 @@
 from passlib.context import CryptContext
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 from uuid import uuid4
+import asyncio
+import hashlib
+import threading
+import time
 import jwt
 import logging
 
+from src.exceptions import ServerOverloaded
 from src.utils.config import settings
 
 
+# min/max rounds pinned to the work factor so `needs_update` flags hashes made with an older factor.
 password_context = CryptContext(
-    schemes=['bcrypt']
+    schemes=['bcrypt'],
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
 )
 
 
@@ -21,6 +33,79 @@ def verify_password(password: str, hash_string: str) -> bool:
     return password_context.verify(password, hash_string) 
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size limited thread pool so it never blocks the event loop.
+    Once `max_pending` calls are queued or running, new calls fail fast with `ServerOverloaded`.
+    """
+    
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+    
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServerOverloaded("Password hashing pool is saturated.", retry_after=settings.OVERLOAD_RETRY_AFTER)
+        
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(password_context.hash, password)
+    
+    async def verify_and_update(self, password: str, hash_string: str) -> Tuple[bool, Optional[str]]:
+        """ Returns `(valid, new_hash)`, `new_hash` is set when the stored hash uses an outdated work factor. """
+        return await self._run(password_context.verify_and_update, password, hash_string)
+    
+    async def warmup(self):
+        """ Starts the hashing threads and loads the bcrypt backend ahead of the first login. """
+        loop = asyncio.get_running_loop()
+        load_backend = password_context.handler().get_backend
+        await asyncio.gather(*[loop.run_in_executor(self._pool(), load_backend) for _ in range(self.max_workers)])
+    
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.pending,
+            "queue_depth": max(0, self.pending - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_seconds_total": self.total_seconds,
+            "latency_seconds_max": self.max_seconds,
+        }
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
 def create_access_token(user_data: dict, expiry: int = 3600, refresh: bool = False):
     payload = {
         "user": user_data,
@@ -36,14 +121,84 @@ def create_access_token(user_data: dict, expiry: int = 3600, refresh: bool = Fal
     )
     
     
-async def decode_token(jwt_token: str):
+class DecodedTokenCache:
+    """
+    Bounded LRU from the token digest to its verified claims, so the signature of a token is checked
+    once per worker. Entries expire with the token's `exp` and can be evicted by `jti` on revocation.
+    The cached claims are shared, callers must not mutate them.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._jti_index: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        
+    @staticmethod
+    def _key(jwt_token: str) -> bytes:
+        return hashlib.sha256(jwt_token.encode()).digest()
+    
+    def get(self, jwt_token: str) -> Optional[dict]:
+        key = self._key(jwt_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, jwt_token: str, claims: dict):
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        key = self._key(jwt_token)
+        with self._lock:
+            self._entries[key] = (float(exp), claims)
+            self._entries.move_to_end(key)
+            if claims.get("jti"):
+                self._jti_index[claims["jti"]] = key
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: bytes):
+        _, claims = self._entries.pop(key)
+        self._jti_index.pop(claims.get("jti"), None)
+    
+    def evict_jti(self, jti: str):
+        with self._lock:
+            key = self._jti_index.get(jti)
+            if key is not None and key in self._entries:
+                self._remove(key)
+    
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+decoded_token_cache = DecodedTokenCache(max_size=settings.JWT_CACHE_SIZE)
+
+
+def decode_token(jwt_token: str):
+    claims = decoded_token_cache.get(jwt_token)
+    if claims is not None:
+        return claims
     
     try:
-        return jwt.decode(
+        claims = jwt.decode(
             jwt=jwt_token,
             key=settings.JWT_SECRET,
             algorithms=[settings.JWT_ALGORITHM]
         )
     except jwt.PyJWTError as jwt_e:
         logging.exception(jwt_e)
-        return None
\ No newline at end of file
+        return None
+    
+    decoded_token_cache.set(jwt_token, claims)
+    return claims
@@ -0,0 +1,93 @@
+from pydantic import ValidationError
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import uuid4
+import csv
+import io
+import json
+
+from src.books.schemas import BooksCreateModel
+
+
+BOOK_COLUMNS = (
+    "uid", "title", "author", "publisher", "published_date", "page_count",
+    "language", "user_uid", "created_at", "updated_at",
+)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """ Splits a streamed request body into lines without buffering the whole body. """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Yields `(line_number, record, error)` for every non blank line. CSV input needs a header row,
+    quoted fields spanning several lines are not supported.
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = [name.strip() for name in values]
+                    continue
+                if len(values) != len(header):
+                    raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+                record = dict(zip(header, values))
+            else:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+        except (ValueError, csv.Error) as e:
+            yield line_number, None, str(e)
+            continue
+        yield line_number, record, None
+
+
+def build_book_row(record: dict, user_uid, now: datetime) -> dict:
+    """ Validates a raw record into a `books` row, raises `ValueError` with a readable message. """
+    try:
+        book_data = BooksCreateModel.model_validate(record)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())) from None
+    
+    row = book_data.model_dump()
+    row["published_date"] = date.fromisoformat(row["published_date"])
+    row["uid"] = uuid4()
+    row["user_uid"] = user_uid
+    row["created_at"] = now
+    row["updated_at"] = now
+    return row
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def export_ndjson(rows: List[dict]) -> bytes:
+    return "".join(json.dumps(dict(row), default=_json_default) + "\n" for row in rows).encode()
+
+
+def export_csv(rows: List[dict], columns: List[str], with_header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_json_default(row[column]) if row[column] is not None else "" for column in columns])
+    return buffer.getvalue().encode()
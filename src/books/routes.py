@@ -1,64 +1,170 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query, Header
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from uuid import UUID
 
 from src.books.books_data import books
 from src.books.services import BookService
-from src.books.schemas import BooksCreateModel, BooksModel, BooksUpdateModel, BookDetailModel
-from src.db.db_agent import get_session
+from src.books.schemas import BooksCreateModel, BooksModel, BooksUpdateModel, BookDetailModel, BulkImportResultModel
+from src.books.bulk import iter_lines, export_ndjson, export_csv
+from src.db.db_agent import get_session, get_read_session, is_request_pinned, read_session_factory, on_primary
+from src.db.cache import Entity, response_cache, if_match_versions
 from src.auth.dependencies import AccessTokenBearer, RoleChecker
 from src.db.models import ROLES
+from src.utils.pagination import Page, PageParams
+from src.reviews.schemas import RatingSummaryModel
+from src.reviews.services import ReviewService
+from src.utils.config import settings
+from src.utils.serialization import dump_model, dump_page, to_plain
+from src.rate_limit import RateLimit
 
 
 book_route = APIRouter()
 role_checker = Depends(
     RoleChecker([ROLES.USER.value, ROLES.ADMIN.value])
 )
+# After `role_checker`, which parses the access token the per user limit is keyed by.
+write_rate_limit = Depends(RateLimit("write"))
 
 def get_book_service():
     return BookService()
 
 
 access_token_bearer = AccessTokenBearer()
+review_service = ReviewService()
 
+def if_match_header(if_match: Optional[str] = Header(default=None)) -> Optional[List[int]]:
+    return if_match_versions(if_match) if if_match is not None else None
 
-@book_route.get("/", response_model=List[BooksModel], dependencies=[role_checker])
+
+@book_route.get("/", response_model=Page[BooksModel], dependencies=[role_checker])
 async def get_all_books(
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
     book_service: BookService = Depends(get_book_service),
     access_user_details: dict = Depends(access_token_bearer)
 ):
-    data = await book_service.get_all_books(session=session)
-    return data
+    async def load(session: AsyncSession) -> Entity:
+        data = await book_service.get_all_books(session=session, limit=page.limit, cursor=page.cursor)
+        return Entity(dump_page(BooksModel, data))
+    
+    return await response_cache.respond(
+        request, route="books_list", resource="books", key=f"books:{page.limit}:{page.cursor}",
+        compute=lambda: load(session), fill=lambda: on_primary(load), bypass=await is_request_pinned(request)
+    )
 
 
-@book_route.get("/user/{user_uid}", response_model=List[BooksModel], dependencies=[role_checker])
+@book_route.get("/user/{user_uid}", response_model=Page[BooksModel], dependencies=[role_checker])
 async def get_books_for_user(
-    user_uid: str,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    user_uid: UUID,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+    book_service: BookService = Depends(get_book_service),
+    access_user_details: dict = Depends(access_token_bearer)
+):
+    async def load(session: AsyncSession) -> Entity:
+        data = await book_service.get_all_books_for_user(
+            user_uid=user_uid, session=session, limit=page.limit, cursor=page.cursor
+        )
+        return Entity(dump_page(BooksModel, data))
+    
+    return await response_cache.respond(
+        request, route="user_books_list", resource="books", key=f"books:user:{user_uid}:{page.limit}:{page.cursor}",
+        compute=lambda: load(session), fill=lambda: on_primary(load), bypass=await is_request_pinned(request)
+    )
+
+
+@book_route.get("/search", response_model=Page[BooksModel], dependencies=[role_checker])
+async def search_books(
+    q: str = Query(min_length=1, max_length=200),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
     book_service: BookService = Depends(get_book_service),
     access_user_details: dict = Depends(access_token_bearer)
 ):
-    data = await book_service.get_all_books_for_user(user_uid=user_uid, session=session)
-    return data
+    data = await book_service.search_books(q, session=session, limit=page.limit, cursor=page.cursor)
+    return Response(content=dump_page(BooksModel, data), media_type="application/json")
+
+
+@book_route.get("/export", dependencies=[role_checker])
+async def export_books(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    user_uid: Optional[UUID] = Query(default=None),
+    book_service: BookService = Depends(get_book_service),
+    access_user_details: dict = Depends(access_token_bearer)
+):
+    # The session has to outlive the dependency scope, so the stream opens its own.
+    session_maker = await read_session_factory(request)
+    columns = list(BooksModel.model_fields)
+    
+    async def stream():
+        async with session_maker() as session:
+            first = True
+            async for rows in book_service.export_books(session=session, user_uid=user_uid):
+                yield export_csv(rows, columns, with_header=first) if format == "csv" else export_ndjson(rows)
+                first = False
+            if first and format == "csv":
+                yield export_csv([], columns, with_header=True)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream(), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'}
+    )
 
 
 @book_route.get("/{book_id}", response_model=BookDetailModel, dependencies=[role_checker])
 async def get_book(
+    request: Request,
     book_id: UUID,
-    session: AsyncSession = Depends(get_session),
+    include_reviews: bool = Query(
+        default=settings.BOOK_DETAIL_EMBED_REVIEWS,
+        description="Embed every review, use `GET /reviews/book/{book_uid}` to page through them instead."
+    ),
+    session: AsyncSession = Depends(get_read_session),
     book_service: BookService = Depends(get_book_service),
     access_user_details: dict = Depends(access_token_bearer)
 ):
-    book_data = await book_service.get_book(book_id, session=session)
-    if not book_data:
-        raise HTTPException(status_code=404, detail=f"Invalid ID - {id}")
+    async def load(session: AsyncSession) -> Entity:
+        book_data = await book_service.get_book(book_id, session=session, with_reviews=include_reviews, with_summary=True)
+        if not book_data:
+            raise HTTPException(status_code=404, detail=f"Invalid ID - {book_id}")
+        if include_reviews:
+            return Entity(dump_model(BookDetailModel, book_data), book_data.version)
+        body = dump_model(
+            BookDetailModel,
+            {**to_plain(BooksModel, book_data), "reviews": None, "rating_summary": book_data.rating_summary}
+        )
+        return Entity(body, book_data.version)
     
-    return book_data
+    return await response_cache.respond(
+        request, route="book_detail", resource=f"book:{book_id}",
+        key=f"book:{book_id}:{int(include_reviews)}", compute=lambda: load(session), fill=lambda: on_primary(load),
+        bypass=await is_request_pinned(request)
+    )
+
 
+@book_route.get("/{book_id}/stats", response_model=RatingSummaryModel, dependencies=[role_checker])
+async def get_book_stats(
+    book_id: UUID,
+    session: AsyncSession = Depends(get_read_session),
+    book_service: BookService = Depends(get_book_service),
+    access_user_details: dict = Depends(access_token_bearer)
+):
+    summary = await review_service.get_rating_summary(book_id, session=session)
+    if summary:
+        return summary
+    
+    if not await book_service.get_book(book_id, session=session):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Invalid ID - {book_id}")
+    return RatingSummaryModel()
 
-@book_route.post("/", response_model=BooksModel, status_code=status.HTTP_201_CREATED, dependencies=[role_checker])
+
+@book_route.post("/", response_model=BooksModel, status_code=status.HTTP_201_CREATED, dependencies=[role_checker, write_rate_limit])
 async def create_book(
     book_data: BooksCreateModel,
     session: AsyncSession = Depends(get_session),
@@ -66,7 +172,7 @@ async def create_book(
     access_user_details: dict = Depends(access_token_bearer)
     ):
     
-    user_uid = access_user_details.get("user").get("user_uid")
+    user_uid = UUID(access_user_details.get("user").get("user_uid"))
     new_book_data = await book_service.create_book(book_data=book_data, user_uid=user_uid, session=session)
     if new_book_data:
         return new_book_data
@@ -74,30 +180,52 @@ async def create_book(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid data format.")
 
 
-@book_route.patch("/{id}", response_model=BooksModel, status_code=status.HTTP_200_OK, dependencies=[role_checker])
+@book_route.post("/bulk", response_model=BulkImportResultModel, status_code=status.HTTP_200_OK, dependencies=[role_checker, write_rate_limit])
+async def bulk_import_books(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(
+        default=None, description="Defaults to csv for a `text/csv` body and ndjson otherwise."
+    ),
+    session: AsyncSession = Depends(get_session),
+    book_service: BookService = Depends(get_book_service),
+    access_user_details: dict = Depends(access_token_bearer)
+):
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    
+    user_uid = UUID(access_user_details.get("user").get("user_uid"))
+    return await book_service.bulk_import(
+        lines=iter_lines(request.stream()), fmt=format, user_uid=user_uid, session=session
+    )
+
+
+@book_route.patch("/{book_id}", response_model=BooksModel, status_code=status.HTTP_200_OK, dependencies=[role_checker, write_rate_limit])
 async def update_book(
     book_id: UUID,
     book_data: BooksUpdateModel,
+    versions: Optional[List[int]] = Depends(if_match_header),
     session: AsyncSession = Depends(get_session),
     book_service: BookService = Depends(get_book_service),
     access_user_details: dict = Depends(access_token_bearer)
 ):
     updated_book_data = await book_service.update_book(
-        book_id=book_id, book_data=book_data, session=session
+        book_id=book_id, book_data=book_data, session=session, versions=versions
         )
     if updated_book_data:
-        return updated_book_data
+        entity = Entity(dump_model(BooksModel, updated_book_data), updated_book_data["version"])
+        return Response(content=entity.body, media_type="application/json", headers={"ETag": entity.etag})
     else:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Invalid ID - {book_id}")
     
 
-@book_route.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[role_checker])
+@book_route.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[role_checker, write_rate_limit])
 async def delete_book(
     book_id: UUID,
+    versions: Optional[List[int]] = Depends(if_match_header),
     session: AsyncSession = Depends(get_session),
     book_service: BookService = Depends(get_book_service),
     access_user_details: dict = Depends(access_token_bearer)
 ):
-    deleted_book_data = await book_service.delete_book(book_id=book_id, session=session)
-    if not deleted_book_data:
+    deleted_book_uid = await book_service.delete_book(book_id=book_id, session=session, versions=versions)
+    if not deleted_book_uid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Invalid ID - {book_id}")
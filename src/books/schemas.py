@@ -3,11 +3,12 @@ from uuid import UUID
 from typing import Optional, List
 from datetime import datetime, date
 
-from src.reviews.schemas import ReviewModel
+from src.reviews.schemas import ReviewModel, RatingSummaryModel
 
 
 class BooksModel(BaseModel):
     uid: UUID
+    version: int
     title: str
     author: str
     publisher: str
@@ -20,7 +21,8 @@ class BooksModel(BaseModel):
     
 
 class BookDetailModel(BooksModel):
-    reviews: List[ReviewModel]
+    reviews: Optional[List[ReviewModel]] = None
+    rating_summary: Optional[RatingSummaryModel] = None
     
 
 class BooksCreateModel(BaseModel):
@@ -38,4 +40,15 @@ class BooksUpdateModel(BaseModel):
     publisher: Optional[str] = None
     published_date: Optional[date] = None
     page_count: Optional[int] = None
-    language: Optional[str] = None
\ No newline at end of file
+    language: Optional[str] = None
+
+
+class BulkImportErrorModel(BaseModel):
+    line: int
+    error: str
+
+
+class BulkImportResultModel(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkImportErrorModel]
@@ -1,26 +1,54 @@
 from datetime import datetime
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select, desc
+from sqlalchemy import tuple_, insert, update, delete, func, or_, literal, exists
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import selectinload
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID
+import logging
+import re
 
-from src.books.schemas import BooksCreateModel, BooksUpdateModel
-from src.db.models import Books
+from src.books.schemas import BooksCreateModel, BooksUpdateModel, BooksModel
+from src.books.bulk import BOOK_COLUMNS, iter_records, build_book_row
+from src.db.models import Books, books_search_vector
+from src.db.cache import response_cache
+from src.utils.pagination import decode_cursor, build_page
+from src.utils.config import settings
+from src.exceptions import PreconditionFailed
+
+
+logger = logging.getLogger(__name__)
+
+
+def _book_cursor(book: Books) -> tuple:
+    return (book.created_at, book.uid)
 
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Books).order_by(desc(Books.created_at))
+    def _paginate_statement(self, statement, limit: int, cursor: Optional[str]):
+        statement = statement.order_by(desc(Books.created_at), desc(Books.uid)).limit(limit + 1)
+        if cursor:
+            created_at, uid = decode_cursor(cursor, datetime.fromisoformat, UUID)
+            statement = statement.where(tuple_(Books.created_at, Books.uid) < (created_at, uid))
+        return statement
+    
+    async def get_all_books(self, session: AsyncSession, limit: int, cursor: Optional[str] = None):
+        statement = self._paginate_statement(select(Books), limit, cursor)
         result = await session.exec(statement)
-        books_data = result.all()
-        return books_data if books_data else []
+        return build_page(result.all(), limit, _book_cursor)
     
-    async def get_all_books_for_user(self, user_uid, session: AsyncSession):
-        statement = select(Books).where(Books.user_uid == user_uid).order_by(desc(Books.created_at))
+    async def get_all_books_for_user(self, user_uid, session: AsyncSession, limit: int, cursor: Optional[str] = None):
+        statement = self._paginate_statement(select(Books).where(Books.user_uid == user_uid), limit, cursor)
         result = await session.exec(statement)
-        books_data = result.all()
-        return books_data if books_data else []
+        return build_page(result.all(), limit, _book_cursor)
     
-    async def get_book(self, book_id: str, session: AsyncSession):
+    async def get_book(self, book_id: str, session: AsyncSession, with_reviews: bool = False, with_summary: bool = False):
         statement = select(Books).where(Books.uid == book_id)
+        if with_reviews:
+            statement = statement.options(selectinload(Books.reviews))
+        if with_summary:
+            statement = statement.options(selectinload(Books.rating_summary))
         result = await session.exec(statement)
         book_data = result.first()
         return book_data if book_data else None
@@ -35,28 +63,202 @@ class BookService:
             return None
         session.add(new_book_data)
         await session.commit()
+        await response_cache.invalidate("books")
         return new_book_data
     
-    async def update_book(self, book_id: str, book_data: BooksUpdateModel, session: AsyncSession):
-        existing_book_data = await self.get_book(book_id, session)
-        if not existing_book_data:
-            return None
-        
+    async def _raise_if_stale(self, book_id: UUID, versions: Optional[List[int]], session: AsyncSession):
+        """ A versioned write that matched no row is a conflict when the book still exists, a 404 otherwise. """
+        if versions is not None and await session.scalar(select(exists().where(Books.uid == book_id))):
+            raise PreconditionFailed(f"Book {book_id} was modified, fetch it again and retry with its new ETag.")
+    
+    async def update_book(
+        self, book_id: UUID, book_data: BooksUpdateModel, session: AsyncSession, versions: Optional[List[int]] = None
+    ) -> dict|None:
+        """
+        `UPDATE ... WHERE uid = :id [AND version IN (:versions)] RETURNING *`, bumping the row version.
+        `versions` comes from `If-Match`, `None` updates unconditionally.
+        """
         new_book_data = book_data.model_dump(exclude_none=True)
         if not new_book_data:
             return None
         
-        for k, v in new_book_data.items():
-            setattr(existing_book_data, k, v)
+        table = Books.__table__
+        statement = update(table).where(table.c.uid == book_id).values(
+            **new_book_data, version=table.c.version + 1
+        ).returning(*table.c)
+        if versions is not None:
+            statement = statement.where(table.c.version.in_(versions))
         
+        result = await session.execute(statement)
+        updated_book_data = result.mappings().first()
+        if not updated_book_data:
+            await session.rollback()
+            await self._raise_if_stale(book_id, versions, session)
+            return None
+        
+        updated_book_data = dict(updated_book_data)
         await session.commit()
-        return existing_book_data
+        await response_cache.invalidate("books", f"book:{book_id}")
+        return updated_book_data
     
-    async def delete_book(self, book_id: str, session: AsyncSession):
-        existing_book_data = await self.get_book(book_id, session)
-        if not existing_book_data:
+    async def delete_book(self, book_id: UUID, session: AsyncSession, versions: Optional[List[int]] = None) -> UUID|None:
+        """ `DELETE ... RETURNING uid`, reviews are detached and the rating summary dropped by their foreign keys. """
+        table = Books.__table__
+        statement = delete(table).where(table.c.uid == book_id).returning(table.c.uid)
+        if versions is not None:
+            statement = statement.where(table.c.version.in_(versions))
+        
+        deleted_book_uid = await session.scalar(statement)
+        if not deleted_book_uid:
+            await session.rollback()
+            await self._raise_if_stale(book_id, versions, session)
             return None
         
-        await session.delete(existing_book_data)
         await session.commit()
-        return existing_book_data
\ No newline at end of file
+        await response_cache.invalidate("books", f"book:{book_id}")
+        return deleted_book_uid
+    
+    async def _write_rows(self, rows: List[dict], session: AsyncSession):
+        connection = await session.connection()
+        if connection.dialect.driver == "asyncpg":
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Books.__tablename__,
+                records=[tuple(row[column] for column in BOOK_COLUMNS) for row in rows],
+                columns=list(BOOK_COLUMNS)
+            )
+        else:
+            await session.execute(insert(Books.__table__), rows)
+    
+    async def _write_chunk(self, chunk: List[Tuple[int, dict]], session: AsyncSession, errors: List[dict]) -> int:
+        """ Writes a chunk in one statement, on failure falls back to row by row savepoints to isolate bad rows. """
+        try:
+            async with session.begin_nested():
+                await self._write_rows([row for _, row in chunk], session)
+            return len(chunk)
+        except Exception as e:
+            # COPY surfaces raw driver errors, not the SQLAlchemy wrappers.
+            logger.info("Bulk chunk failed, retrying row by row: %s", e)
+        
+        inserted = 0
+        for line_number, row in chunk:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(Books.__table__), [row])
+                inserted += 1
+            except (IntegrityError, DBAPIError) as e:
+                errors.append({"line": line_number, "error": str(e.orig if hasattr(e, "orig") else e)})
+        return inserted
+    
+    async def bulk_import(self, lines: AsyncIterator[str], fmt: str, user_uid, session: AsyncSession) -> dict:
+        """
+        Imports a streamed NDJSON/CSV catalogue. Records are validated and written in chunks of
+        `BULK_IMPORT_CHUNK_SIZE`, each chunk committed in its own transaction, invalid rows are
+        reported per line without aborting the rest of the import.
+        """
+        inserted = 0
+        failed = 0
+        errors: List[dict] = []
+        chunk: List[Tuple[int, dict]] = []
+        
+        def record_error(line_number: int, message: str):
+            nonlocal failed
+            failed += 1
+            if len(errors) < settings.BULK_IMPORT_MAX_ERRORS:
+                errors.append({"line": line_number, "error": message})
+        
+        async def flush():
+            nonlocal inserted
+            chunk_errors: List[dict] = []
+            written = await self._write_chunk(chunk, session, chunk_errors)
+            await session.commit()
+            inserted += written
+            for error in chunk_errors:
+                record_error(error["line"], error["error"])
+            chunk.clear()
+        
+        async for line_number, record, error in iter_records(lines, fmt):
+            if error:
+                record_error(line_number, error)
+                continue
+            try:
+                chunk.append((line_number, build_book_row(record, user_uid, datetime.now())))
+            except ValueError as e:
+                record_error(line_number, str(e))
+                continue
+            if len(chunk) >= settings.BULK_IMPORT_CHUNK_SIZE:
+                await flush()
+        
+        if chunk:
+            await flush()
+        if inserted:
+            await response_cache.invalidate("books")
+        
+        return {"inserted": inserted, "failed": failed, "errors": errors}
+    
+    async def export_books(self, session: AsyncSession, user_uid=None) -> AsyncIterator[List[dict]]:
+        """ Streams the catalogue from a server side cursor, `EXPORT_BATCH_SIZE` rows at a time. """
+        statement = select(*[getattr(Books, column) for column in BooksModel.model_fields])
+        if user_uid:
+            statement = statement.where(Books.user_uid == user_uid)
+        statement = statement.order_by(desc(Books.created_at), desc(Books.uid)).execution_options(
+            yield_per=settings.EXPORT_BATCH_SIZE
+        )
+        result = await session.stream(statement)
+        async for partition in result.mappings().partitions():
+            yield partition
+    
+    async def _search_books_like(self, terms: List[str], session: AsyncSession, limit: int, cursor: Optional[str]):
+        """ Unranked fallback: every term in the title or the author, newest first, keyset on (created_at, uid). """
+        conditions = []
+        for term in terms:
+            # Terms are `\w+`, `_` is the only LIKE wildcard they can hold.
+            pattern = "%" + term.replace("_", "\\_") + "%"
+            conditions.append(or_(Books.title.ilike(pattern, escape="\\"), Books.author.ilike(pattern, escape="\\")))
+        statement = self._paginate_statement(select(Books).where(*conditions), limit, cursor)
+        result = await session.exec(statement)
+        return build_page(result.all(), limit, _book_cursor)
+    
+    async def search_books(self, query: str, session: AsyncSession, limit: int, cursor: Optional[str] = None):
+        """
+        Ranked search: full-text match on the weighted `search_vector` with the last term matched as
+        a prefix, plus trigram similarity on title/author for typos. Pages are keyset on (rank, uid).
+        
+        Ranking is computed per match, so the work is bounded: the last term is only a prefix from
+        `SEARCH_MIN_PREFIX_LENGTH` characters on (`a:*` matches nearly every row), shorter queries
+        skip the trigram match (their few trigrams are in nearly every row too), and at most
+        `SEARCH_MAX_MATCHES` matches, the first ones the index scan finds, are ranked. Queries
+        broader than that return a relevant subset rather than the best matches overall.
+        
+        Other databases (the SQLite stand-in) get `_search_books_like` instead.
+        """
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return build_page([], limit, _book_cursor)
+        if session.bind.dialect.name != "postgresql":
+            return await self._search_books_like(terms, session=session, limit=limit, cursor=cursor)
+        
+        last = f"{terms[-1]}:*" if len(terms[-1]) >= settings.SEARCH_MIN_PREFIX_LENGTH else terms[-1]
+        ts_query = func.to_tsquery("simple", " & ".join(terms[:-1] + [last]))
+        normalized = " ".join(terms)
+        rank = (
+            func.ts_rank_cd(books_search_vector, ts_query)
+            + func.greatest(func.similarity(Books.title, normalized), func.similarity(Books.author, normalized))
+        ).label("rank")
+        
+        conditions = [books_search_vector.op("@@")(ts_query)]
+        if len(normalized) >= settings.SEARCH_MIN_PREFIX_LENGTH:
+            conditions += [Books.title.op("%")(literal(normalized)), Books.author.op("%")(literal(normalized))]
+        # No ORDER BY, so the scan stops at the cap instead of visiting every match.
+        matches = select(Books.uid).where(or_(*conditions)).limit(settings.SEARCH_MAX_MATCHES)
+        statement = select(Books, rank).where(Books.uid.in_(matches))
+        if cursor:
+            last_rank, last_uid = decode_cursor(cursor, float, UUID)
+            statement = statement.where(tuple_(rank.element, Books.uid) < (last_rank, last_uid))
+        statement = statement.order_by(desc(rank), desc(Books.uid)).limit(limit + 1)
+        
+        result = await session.exec(statement)
+        rows = result.all()
+        page = build_page(rows, limit, lambda row: (row[1], row[0].uid))
+        page["items"] = [book for book, _ in page["items"]]
+        return page
\ No newline at end of file
@@ -0,0 +1,177 @@
+from fastapi import Response, status
+from fastapi.requests import Request
+from functools import cached_property
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+import asyncio
+import hashlib
+import logging
+import re
+
+from src.db.redis import REDIS_ERRORS, CircuitBreaker, CircuitOpen, circuit_breaker, response_cache_client
+from src.utils.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Looks up the version of the resource and the body cached under that version in one round-trip.
+_VERSIONED_GET = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ARGV[2])}
+"""
+
+
+def make_etag(body: bytes, version: Optional[int] = None) -> str:
+    """ Strong entity tag of a body, prefixed with the row version (`"<version>.<digest>"`) for versioned resources. """
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{version}.{digest}"' if version is not None else f'"{digest}"'
+
+
+class Entity(NamedTuple):
+    """ Serialized response body and the row version it was built from, `None` for unversioned resources. """
+    body: bytes
+    version: Optional[int] = None
+    
+    @property
+    def etag(self) -> str:
+        return make_etag(self.body, self.version)
+    
+    def pack(self) -> bytes:
+        return (b"%d" % self.version if self.version is not None else b"") + b"\n" + self.body
+    
+    @classmethod
+    def unpack(cls, data: bytes) -> "Entity":
+        version, _, body = data.partition(b"\n")
+        return cls(body, int(version) if version else None)
+
+
+def if_match_versions(if_match: str) -> Optional[List[int]]:
+    """ Row versions named by an `If-Match` header, `None` for `*` (any version). """
+    if if_match.strip() == "*":
+        return None
+    return [int(version) for version in re.findall(r'(?<!W/)"(\d+)\.[0-9a-f]*"', if_match)]
+
+
+class ResponseCache:
+    """
+    Redis cache of serialized JSON responses. Entries are keyed by the version of the resource they
+    were built from, writers bump that version (`invalidate`) so stale entries are never read again
+    and simply expire. Concurrent misses on the same key within a worker share one computation.
+    A miss is filled by `fill`, which must read the primary: a replica that is behind would store
+    the old body under the new version and serve it for the whole TTL. The row version of the
+    body is stored with it, so the `ETag` of a hit needs no parsing. While `breaker` is open
+    lookups and stores are skipped and responses are computed directly.
+    """
+    
+    def __init__(self, client: Callable, ttl: int, enabled: bool = True, breaker: Optional[CircuitBreaker] = None):
+        self._client = client
+        self.ttl = ttl
+        self.enabled = enabled
+        self.breaker = breaker or circuit_breaker("response_cache")
+        self.route_stats: dict[str, dict[str, int]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+    
+    @property
+    def client(self):
+        return self._client()
+    
+    @cached_property
+    def _versioned_get(self):
+        return self.client.register_script(_VERSIONED_GET)
+        
+    def _count(self, route: str, outcome: str):
+        counters = self.route_stats.setdefault(route, {"hits": 0, "misses": 0, "errors": 0})
+        counters[outcome] += 1
+    
+    async def invalidate(self, *resources: str):
+        if not self.enabled:
+            return
+        # Not guarded by the breaker: skipping an invalidation would let other workers serve stale entries.
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for resource in resources:
+                    pipe.incr(f"ver:{resource}")
+                await pipe.execute()
+        except REDIS_ERRORS as e:
+            logger.warning("Response cache invalidation failed for %s: %s", resources, e)
+    
+    async def _single_flight(self, key: str, compute: Callable[[], Awaitable[Entity]]) -> Entity:
+        inflight = self._inflight.get(key)
+        if inflight:
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            entity = await compute()
+            future.set_result(entity)
+            return entity
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def get_or_compute(
+        self, route: str, resource: str, key: str, compute: Callable[[], Awaitable[Entity]],
+        fill: Optional[Callable[[], Awaitable[Entity]]] = None
+    ) -> Entity:
+        """ Cached entity of `key`, `compute` serves the request when nothing is stored and `fill` builds what is. """
+        if not self.enabled:
+            return await compute()
+        
+        try:
+            version, cached = await self.breaker.call(lambda: self._versioned_get(
+                keys=[f"ver:{resource}"], args=[f"entity:{key}:v", ""], client=self.client
+            ))
+        except REDIS_ERRORS as e:
+            if not isinstance(e, CircuitOpen):
+                logger.warning("Response cache lookup failed for %s: %s", key, e)
+            self._count(route, "errors")
+            return await compute()
+        
+        if cached is not None:
+            self._count(route, "hits")
+            return Entity.unpack(cached)
+        
+        self._count(route, "misses")
+        version = version.decode() if isinstance(version, bytes) else version
+        
+        async def compute_and_store() -> Entity:
+            entity = await (fill or compute)()
+            try:
+                await self.breaker.call(lambda: self.client.set(f"entity:{key}:v{version}", entity.pack(), ex=self.ttl))
+            except REDIS_ERRORS as e:
+                if not isinstance(e, CircuitOpen):
+                    logger.warning("Response cache store failed for %s: %s", key, e)
+            return entity
+        
+        return await self._single_flight(f"{key}:v{version}", compute_and_store)
+    
+    async def respond(
+        self, request: Request, route: str, resource: str, key: str,
+        compute: Callable[[], Awaitable[Entity]], bypass: bool = False,
+        fill: Optional[Callable[[], Awaitable[Entity]]] = None
+    ) -> Response:
+        entity = await compute() if bypass else await self.get_or_compute(route, resource, key, compute, fill)
+        etag = entity.etag
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(content=entity.body, media_type="application/json", headers={"ETag": etag})
+    
+    def stats(self) -> dict:
+        stats = {}
+        for route, counters in self.route_stats.items():
+            lookups = counters["hits"] + counters["misses"]
+            stats[route] = {**counters, "hit_ratio": counters["hits"] / lookups if lookups else 0.0}
+        return stats
+
+
+response_cache = ResponseCache(
+    client=response_cache_client,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    enabled=settings.RESPONSE_CACHE_ENABLED
+)
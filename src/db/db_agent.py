@@ -1,30 +1,322 @@
-from sqlmodel import create_engine, text, SQLModel
-from sqlalchemy.ext.asyncio import AsyncEngine
+from fastapi import Request
+from sqlmodel import SQLModel
+from sqlalchemy import exc, event, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
+from typing import Awaitable, Callable, List, Optional, TypeVar
+from pathlib import Path
+import itertools
+import logging
+import time
 
 from src.utils.config import settings
+from src.db.profiler import query_profiler
+from src.db.redis import REDIS_ERRORS, REPLICA_PINS_DB, circuit_breaker, get_redis
 
 
-async_engine = AsyncEngine(
-    create_engine(
-        url=settings.DATABASE_URL
-    )
-)
+T = TypeVar("T")
 
-async def init_db():
-    async with async_engine.begin() as conn:
-        from src.db.models import Books
-        await conn.run_sync(SQLModel.metadata.create_all)
-        
+logger = logging.getLogger(__name__)
+
+ALEMBIC_CONFIG = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+class PoolStats:
+    """ Checkout wait times of one connection pool, read by the metrics endpoint. """
+    
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
         
-async def get_session() -> AsyncSession: # pyright: ignore[reportInvalidTypeForm]
+    def record(self, waited: float):
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+# Keyed by engine name (`primary`, `replica0`, ...), the pool's `logging_name`.
+_pool_stats: dict[str, PoolStats] = {}
+_engines: dict[str, AsyncEngine] = {}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """ Records checkout waits in the `PoolStats` of its name, which outlive the pool `dispose()` replaces. """
     
-    Session = sessionmaker(
-        bind=async_engine,
-        class_=AsyncSession,
-        expire_on_commit=False
+    def _do_get(self):
+        stats = _pool_stats[self.logging_name]
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.record(time.perf_counter() - start)
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def build_engine(url: str, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_logging_name=name,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING
     )
+    query_profiler.attach(engine)
+    if engine.dialect.name == "sqlite":
+        # SQLite ignores foreign keys unless asked per connection, the cascades and `SET NULL`s rely on them.
+        event.listen(engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+    _pool_stats.setdefault(name, PoolStats())
+    _engines[name] = engine
+    return engine
+
+
+_engine: Optional[AsyncEngine] = None
+_replica_router: Optional["ReplicaRouter"] = None
+
+# Bound to the primary engine when that is first built, see `get_engine`.
+_session_maker = async_sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+
+def get_engine() -> AsyncEngine:
+    """ Primary engine, built on first use so importing the app opens no pool and loads no driver. """
+    global _engine
+    if _engine is None:
+        _engine = build_engine(settings.DATABASE_URL, "primary")
+        _session_maker.configure(bind=_engine)
+    return _engine
+
+
+def get_session_maker() -> async_sessionmaker:
+    get_engine()
+    return _session_maker
+
+
+class ReplicaRouter:
+    """
+    Hands out session factories for read only work. Reads go to the replicas (round robin or
+    least checked out connections) unless the caller wrote to the primary in the last
+    `READ_YOUR_WRITES_SECONDS`, in which case they stay on the primary to read their own writes.
+    The pin is shared with the other workers through a Redis key (`share_pin`), as the next
+    request of a user rarely lands on the worker that served the write.
+    """
     
-    async with Session() as session:
-        yield session
\ No newline at end of file
+    def __init__(self, primary: async_sessionmaker, urls: List[str], strategy: str, pin_seconds: float):
+        self.primary = primary
+        self.engines = [build_engine(url, f"replica{i}") for i, url in enumerate(urls)]
+        self.session_makers = [
+            async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+            for engine in self.engines
+        ]
+        self.strategy = strategy
+        self.pin_seconds = pin_seconds
+        self.breaker = circuit_breaker("replica_pins")
+        self._round_robin = itertools.cycle(range(len(self.engines)))
+        self._pinned: dict[str, float] = {}
+        
+    def pin(self, key: str):
+        now = time.monotonic()
+        self._pinned[key] = now + self.pin_seconds
+        if len(self._pinned) > 10000:
+            self._pinned = {k: until for k, until in self._pinned.items() if until > now}
+    
+    async def share_pin(self, key: str):
+        """ Makes the pin of `key` visible to every worker, only needed when there are replicas to avoid. """
+        if not self.session_makers:
+            return
+        try:
+            await self.breaker.call(
+                lambda: get_redis(REPLICA_PINS_DB).set(f"ryw:{key}", 1, px=max(1, int(self.pin_seconds * 1000)))
+            )
+        except REDIS_ERRORS as e:
+            logger.warning("Read your writes pin of %s not shared: %r", key, e)
+    
+    def _is_pinned_locally(self, key: str) -> bool:
+        until = self._pinned.get(key)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            self._pinned.pop(key, None)
+            return False
+        return True
+    
+    async def is_pinned(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        if self._is_pinned_locally(key):
+            return True
+        if not self.session_makers:
+            return False
+        try:
+            return bool(await self.breaker.call(lambda: get_redis(REPLICA_PINS_DB).exists(f"ryw:{key}")))
+        except REDIS_ERRORS:
+            return False
+    
+    async def pick(self, key: Optional[str] = None) -> async_sessionmaker:
+        if not self.session_makers or await self.is_pinned(key):
+            return self.primary
+        if self.strategy == "least_connections":
+            index = min(range(len(self.engines)), key=lambda i: self.engines[i].pool.checkedout())
+        else:
+            index = next(self._round_robin)
+        return self.session_makers[index]
+    
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+
+
+def get_replica_router() -> ReplicaRouter:
+    global _replica_router
+    if _replica_router is None:
+        _replica_router = ReplicaRouter(
+            primary=get_session_maker(),
+            urls=settings.replica_urls,
+            strategy=settings.REPLICA_STRATEGY,
+            pin_seconds=settings.READ_YOUR_WRITES_SECONDS
+        )
+    return _replica_router
+
+
+def __getattr__(name: str):
+    # `async_engine`, `async_session_maker` and `replica_router` stay importable, built on first access.
+    lazy = {"async_engine": get_engine, "async_session_maker": get_session_maker, "replica_router": get_replica_router}
+    if name in lazy:
+        return lazy[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _request_user_key(request: Request) -> Optional[str]:
+    memo = getattr(request.state, "parsed_token", None)
+    if not memo:
+        return None
+    return (memo[1].get("user") or {}).get("user_uid")
+
+
+async def is_request_pinned(request: Request) -> bool:
+    return await get_replica_router().is_pinned(_request_user_key(request))
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_writer_to_primary(session: Session):
+    request = session.info.get("request")
+    if request is None:
+        return
+    user_key = _request_user_key(request)
+    if user_key:
+        get_replica_router().pin(user_key)
+        # Shared by `ReadYourWritesMiddleware` before the response goes out, events cannot await.
+        request.state.pinned_user = user_key
+
+
+def pool_metrics() -> dict:
+    """ Usage and checkout waits of every pool built so far, labelled `primary` and `replica<N>`. """
+    metrics = {}
+    for name, engine in _engines.items():
+        pool, stats = engine.pool, _pool_stats[name]
+        metrics[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": stats.wait_seconds_total,
+            "wait_seconds_max": stats.wait_seconds_max,
+        }
+    return metrics
+
+
+def dialect_insert(session: AsyncSession):
+    """ `insert()` of the session's dialect, both PostgreSQL and SQLite support `ON CONFLICT` clauses. """
+    return sqlite_insert if session.bind.dialect.name == "sqlite" else pg_insert
+
+
+def alembic_head() -> str:
+    """ Head revision of the migration scripts shipped with the app. """
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(Config(str(ALEMBIC_CONFIG))).get_current_head()
+
+
+async def check_schema():
+    """ Fails the startup unless the database was migrated to exactly the head revision of this build. """
+    head = alembic_head()
+    async with get_engine().connect() as conn:
+        try:
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars().all()
+        except exc.DBAPIError:
+            current = []
+    if current != [head]:
+        raise RuntimeError(
+            f"Database schema is at {', '.join(current) or 'no revision'}, this build expects {head}: "
+            f"run `alembic upgrade head` before starting the server."
+        )
+    logger.info("Database schema at revision %s", head)
+
+
+async def init_db():
+    """
+    Prepares the schema according to `SCHEMA_STARTUP_MODE`: `create` issues the DDL for missing
+    tables (local development), `check` only verifies the alembic revision (deployments, where
+    migrations run before the rollout) and `skip` does neither.
+    """
+    mode = settings.SCHEMA_STARTUP_MODE
+    if mode == "check":
+        await check_schema()
+    elif mode == "create":
+        async with get_engine().begin() as conn:
+            from src.db.models import Books
+            if conn.dialect.name == "postgresql":
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(SQLModel.metadata.create_all)
+    elif mode != "skip":
+        raise ValueError(f"Unknown SCHEMA_STARTUP_MODE {mode!r}, expected create, check or skip.")
+
+
+async def close_db():
+    global _engine, _replica_router
+    if _replica_router is not None:
+        await _replica_router.dispose()
+        _replica_router = None
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        
+        
+async def get_session(request: Request) -> AsyncSession: # pyright: ignore[reportInvalidTypeForm]
+    async with get_session_maker()() as session:
+        session.info["request"] = request
+        yield session
+
+
+async def on_primary(work: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """ Runs `work` on its own primary session, for results shared with other requests such as cache fills. """
+    async with get_session_maker()() as session:
+        return await work(session)
+
+
+async def read_session_factory(request: Request) -> async_sessionmaker:
+    """ Session factory for read only work outside the request scope, e.g. streamed responses. """
+    return await get_replica_router().pick(_request_user_key(request))
+
+
+async def get_read_session(request: Request) -> AsyncSession: # pyright: ignore[reportInvalidTypeForm]
+    """ Session for read only routes, served by a replica when `DATABASE_REPLICA_URLS` is set. """
+    async with (await read_session_factory(request))() as session:
+        yield session
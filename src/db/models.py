@@ -1,5 +1,6 @@
 # from pydantic import BaseModel
 from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import Index, ForeignKey, DDL, event, literal_column, text
 import sqlalchemy.dialects.postgresql as pg
 from uuid import UUID, uuid4
 from datetime import datetime, date
@@ -15,6 +16,9 @@ class ROLES(StrEnum):
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ux_users_email_lower", text("lower(email)"), unique=True),
+    )
     
     uid: UUID = Field(
         sa_column=Column( pg.UUID, primary_key=True, default=uuid4 )
@@ -31,10 +35,10 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP , default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP , default=datetime.now))
     books: List["Books"] = Relationship( # type: ignore
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "select"}
     )
     reviews: List["Reviews"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "select"}
     )
     
     def __repr__(self):
@@ -43,6 +47,10 @@ class User(SQLModel, table=True):
 
 class Books(SQLModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        Index("ix_books_user_uid_created_at", "user_uid", "created_at", "uid"),
+    )
     uid: uuid.UUID = Field(
         sa_column=Column( pg.UUID, primary_key=True, unique=True, default=uuid.uuid4 )
     )
@@ -52,31 +60,97 @@ class Books(SQLModel, table=True):
     published_date: date
     page_count: int
     language: str
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now))
     user: Optional[User] = Relationship(back_populates="books")
     reviews: List["Reviews"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book", sa_relationship_kwargs={"lazy": "select", "passive_deletes": True}
+    )
+    rating_summary: Optional["BookRatingSummary"] = Relationship(
+        back_populates="book",
+        sa_relationship_kwargs={"lazy": "select", "uselist": False, "cascade": "all, delete-orphan", "passive_deletes": True}
     )
 
     def __repr__(self):
         return f"<Book: ID - {self.uid} Title - {self.title}>"
 
 
+# Full-text search column over title, author and publisher. It only exists on PostgreSQL and is
+# never mapped, so `select(Books)` does not load it and other dialects can still create the schema.
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')"
+)
+books_search_vector = literal_column("books.search_vector", type_=pg.TSVECTOR)
+
+event.listen(
+    Books.__table__, "after_create",
+    DDL(
+        f"ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED"
+    ).execute_if(dialect="postgresql")
+)
+event.listen(
+    Books.__table__, "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector)"
+    ).execute_if(dialect="postgresql")
+)
+Index(
+    "ix_books_title_author_trgm", Books.__table__.c.title, Books.__table__.c.author,
+    postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops", "author": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+
+
 class Reviews(SQLModel, table=True):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_user_uid", "user_uid"),
+        Index("ix_reviews_book_uid_rating_created_at_uid", "book_uid", "rating", "created_at", "uid"),
+        Index("ix_reviews_book_uid_created_at_uid", "book_uid", "created_at", "uid"),
+    )
     uid: uuid.UUID = Field(
         sa_column=Column( pg.UUID, primary_key=True, unique=True, default=uuid.uuid4 )
     )
     rating: int = Field(le=5, ge=0)
     review_text: str
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
-    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid")
+    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid", ondelete="SET NULL")
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now))
     user: Optional[User] = Relationship(back_populates="reviews")
     book: Optional[Books] = Relationship(back_populates="reviews")
 
     def __repr__(self):
-        return f"<Review: book - {self.book_uid} by User - {self.user_uid}>"
\ No newline at end of file
+        return f"<Review: book - {self.book_uid} by User - {self.user_uid}>"
+
+
+class BookRatingSummary(SQLModel, table=True):
+    """ Denormalized review aggregates of a book, maintained in the same transaction as each new review. """
+    __tablename__ = "book_rating_summaries"
+    book_uid: uuid.UUID = Field(
+        sa_column=Column( pg.UUID, ForeignKey("books.uid", ondelete="CASCADE"), primary_key=True )
+    )
+    review_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_sum: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_0: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_1: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_2: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_3: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_4: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    rating_5: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    book: Optional[Books] = Relationship(back_populates="rating_summary")
+    
+    @property
+    def average_rating(self) -> float:
+        return self.rating_sum / self.review_count if self.review_count else 0.0
+    
+    @property
+    def histogram(self) -> dict:
+        return {rating: getattr(self, f"rating_{rating}") for rating in range(6)}
+
+    def __repr__(self):
+        return f"<BookRatingSummary: book - {self.book_uid} count - {self.review_count}>"
@@ -0,0 +1,148 @@
+from contextvars import ContextVar
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from typing import Optional
+import logging
+import random
+import re
+import time
+
+from src.utils.config import settings
+
+
+logger = logging.getLogger("secured_server.sql")
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|\$\d+|(?<!:):\w+"), "?"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+@lru_cache(maxsize=4096)
+def normalize_statement(statement: str) -> str:
+    """ Statement with literals and bound parameters replaced by `?`, so executions group by shape. """
+    for pattern, replacement in _LITERALS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+class RequestProfile:
+    """ SQL work of one request, filled in by the engine events while the request runs. """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.db_seconds += elapsed
+        if elapsed > self.slowest_seconds:
+            self.slowest_seconds = elapsed
+            self.slowest_statement = statement
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_sql_profile", default=None)
+
+
+class QueryProfiler:
+    """
+    Times every statement of the instrumented engines. Each execution is charged to the profile
+    of the request it runs in, aggregated per normalized statement for the worker wide top list,
+    and logged (sampled) when slower than `slow_seconds`.
+    """
+
+    def __init__(self, slow_seconds: float, slow_sample_rate: float, max_statements: int):
+        self.slow_seconds = slow_seconds
+        self.slow_sample_rate = slow_sample_rate
+        self.max_statements = max_statements
+        self.queries = 0
+        self.slow_queries = 0
+        self.failed_queries = 0
+        # normalized statement -> [calls, total seconds, max seconds]
+        self._statements: dict[str, list] = {}
+
+    def attach(self, engine: AsyncEngine):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append((context, time.perf_counter()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        _, started = conn.info["query_start_time"].pop()
+        elapsed = time.perf_counter() - started
+        self.queries += 1
+
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed)
+
+        normalized = normalize_statement(statement)
+        entry = self._statements.get(normalized)
+        if entry is None and len(self._statements) < self.max_statements:
+            entry = self._statements[normalized] = [0, 0.0, 0.0]
+        if entry is not None:
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+        if elapsed >= self.slow_seconds:
+            self.slow_queries += 1
+            if random.random() < self.slow_sample_rate:
+                logger.warning(
+                    "slow query",
+                    extra={
+                        "statement": normalized,
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "executemany": executemany,
+                        "path": profile.path if profile else None,
+                    }
+                )
+
+    def _handle_error(self, exception_context):
+        # `after_cursor_execute` does not run for a failed statement, its start time would stay on
+        # the connection for good. Errors raised outside a statement (connect, fetch) have none.
+        conn = exception_context.connection
+        pending = conn.info.get("query_start_time") if conn is not None else None
+        if pending and pending[-1][0] is exception_context.execution_context:
+            pending.pop()
+            self.failed_queries += 1
+
+    def top(self, n: int = 20) -> list[dict]:
+        ranked = sorted(self._statements.items(), key=lambda item: item[1][1], reverse=True)[:n]
+        return [
+            {
+                "statement": statement,
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / calls, 3),
+                "max_ms": round(slowest * 1000, 3),
+            }
+            for statement, (calls, total, slowest) in ranked
+        ]
+
+    def reset(self):
+        self._statements.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "slow_queries": self.slow_queries,
+            "failed_queries": self.failed_queries,
+            "statements": len(self._statements),
+        }
+
+
+query_profiler = QueryProfiler(
+    slow_seconds=settings.SLOW_QUERY_SECONDS,
+    slow_sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+    max_statements=settings.SQL_PROFILER_MAX_STATEMENTS
+)
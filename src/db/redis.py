@@ -1,22 +1,344 @@
 import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import EqualJitterBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError
+from typing import Awaitable, Callable, Optional, TypeVar
+import contextlib
+import asyncio
+import logging
+import time
 
+from src.exceptions import ServerOverloaded
 from src.utils.config import settings
 
 
+T = TypeVar("T")
 
-token_block_list = aioredis.StrictRedis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    db=0,
-    socket_connect_timeout=10
+logger = logging.getLogger(__name__)
+
+# Everything a Redis call can fail with once the pool, socket and retry budgets are spent.
+REDIS_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+TOKEN_BLOCKLIST_DB = 0
+RESPONSE_CACHE_DB = 1
+RATE_LIMIT_DB = 2
+REPLICA_PINS_DB = 3
+
+_clients: dict[int, aioredis.StrictRedis] = {}
+
+
+def get_redis(db: int) -> aioredis.StrictRedis:
+    """
+    Client of one logical database, created on first use. Its pool blocks for at most
+    `REDIS_POOL_TIMEOUT` when all `REDIS_MAX_CONNECTIONS` are busy, idle connections are pinged
+    before reuse every `REDIS_HEALTH_CHECK_INTERVAL` and connection errors or timeouts are retried
+    with jittered exponential backoff.
+    """
+    client = _clients.get(db)
+    if client is None:
+        pool = aioredis.BlockingConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=db,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_keepalive=True,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            retry=Retry(
+                EqualJitterBackoff(cap=settings.REDIS_RETRY_BACKOFF_CAP, base=settings.REDIS_RETRY_BACKOFF_BASE),
+                settings.REDIS_RETRIES
+            )
+        )
+        client = _clients[db] = aioredis.StrictRedis(connection_pool=pool)
+    return client
+
+
+def token_block_list() -> aioredis.StrictRedis:
+    return get_redis(TOKEN_BLOCKLIST_DB)
+
+
+def response_cache_client() -> aioredis.StrictRedis:
+    return get_redis(RESPONSE_CACHE_DB)
+
+
+def rate_limit_client() -> aioredis.StrictRedis:
+    return get_redis(RATE_LIMIT_DB)
+
+
+def redis_clients() -> list:
+    return [token_block_list(), response_cache_client(), rate_limit_client()]
+
+
+async def close_redis():
+    for client in list(_clients.values()):
+        await client.aclose()
+        await client.connection_pool.disconnect()
+    _clients.clear()
+
+
+class CircuitOpen(RedisConnectionError):
+    """ Raised instead of calling Redis while a circuit breaker is open. """
+
+
+class CircuitBreaker:
+    """
+    Stops calling Redis after `failure_threshold` consecutive failures, so a brownout costs one
+    timeout per worker rather than one per request. After `reset_seconds` a single probe call is
+    let through: it closes the breaker on success and opens it again on failure.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self.trips = 0
+        self._probing = False
+    
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+    
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self._probing and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+    
+    def success(self):
+        if self.opened_at is not None:
+            logger.info("Redis circuit %s closed", self.name)
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+    
+    def failure(self):
+        self.failures += 1
+        if self._probing:
+            self.opened_at = time.monotonic()
+            self._probing = False
+        elif self.opened_at is None and self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            logger.warning("Redis circuit %s opened after %d failures", self.name, self.failures)
+    
+    @contextlib.asynccontextmanager
+    async def guard(self):
+        """ Runs the block unless the breaker is open (`CircuitOpen`), recording its outcome. """
+        if not self.allow():
+            raise CircuitOpen(f"Redis circuit {self.name} is open.")
+        try:
+            yield
+        except REDIS_ERRORS:
+            self.failure()
+            raise
+        except BaseException:
+            # Cancelled or failed outside Redis, only release the probe slot.
+            self._probing = False
+            raise
+        self.success()
+    
+    async def call(self, operation: Callable[[], Awaitable[T]]) -> T:
+        async with self.guard():
+            return await operation()
+    
+    def stats(self) -> dict:
+        return {
+            "open": self.is_open,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+_breakers: list[CircuitBreaker] = []
+
+
+def circuit_breaker(name: str) -> CircuitBreaker:
+    breaker = CircuitBreaker(name, settings.REDIS_BREAKER_FAILURES, settings.REDIS_BREAKER_RESET_SECONDS)
+    _breakers.append(breaker)
+    return breaker
+
+
+@contextlib.asynccontextmanager
+async def pipeline(db: int, breaker: CircuitBreaker, transaction: bool = False):
+    """
+    Pipeline on the pooled client of `db`, for callers with several commands to send: the
+    commands queued in the block go out in one round-trip on `execute()`. Guarded by `breaker`.
+    """
+    async with breaker.guard():
+        async with get_redis(db).pipeline(transaction=transaction) as pipe:
+            yield pipe
+
+
+def redis_stats() -> dict:
+    """ Pool usage per logical database and the state of every circuit breaker, for the metrics. """
+    stats = {}
+    for db, client in _clients.items():
+        pool = client.connection_pool
+        stats[f"db{db}"] = {
+            "max_connections": pool.max_connections,
+            "in_use_connections": len(getattr(pool, "_in_use_connections", ())),
+            "idle_connections": len(getattr(pool, "_available_connections", ())),
+        }
+    for breaker in _breakers:
+        stats[f"breaker_{breaker.name}"] = breaker.stats()
+    return stats
+
+
+BLOCKLIST_CHANNEL = "token_blocklist"
+
+
+class BlocklistMirror:
+    """
+    In-process copy of the revoked jtis, loaded from a snapshot of the blocklist db and kept fresh
+    through pub/sub. While it is in sync a jti it does not hold is definitely not revoked, so the
+    Redis round-trip is only paid for possible hits. Out of sync (startup, lost subscription) every
+    lookup goes to Redis.
+    
+    Lookups Redis cannot answer, or that the circuit breaker rejects, fail open on the mirror
+    (tokens revoked before the outage stay revoked) or fail closed with a 503, per `fail_open`.
+    
+    Other in-process caches get their invalidations over the same subscription, see `on_channel`.
+    """
+    
+    def __init__(self, client: Callable[[], aioredis.StrictRedis], ttl: int, fail_open: bool = True):
+        self._client = client
+        self.ttl = ttl
+        self.fail_open = fail_open
+        self.breaker = circuit_breaker("token_blocklist")
+        self.ready = False
+        self.local_negatives = 0
+        self.remote_lookups = 0
+        self.unavailable = 0
+        self._revoked: dict[str, float] = {}
+        self._listeners: list[Callable[[str], None]] = []
+        self._channels: dict[str, Callable[[Optional[str]], None]] = {}
+        self._task: asyncio.Task | None = None
+        
+    @property
+    def client(self) -> aioredis.StrictRedis:
+        return self._client()
+        
+    def on_revoke(self, listener: Callable[[str], None]):
+        self._listeners.append(listener)
+    
+    def on_channel(self, channel: str, handler: Callable[[Optional[str]], None]):
+        """
+        Delivers the messages of `channel` to `handler`. `handler(None)` runs each time the
+        subscription is (re)established, as whatever was published while it was down is lost.
+        """
+        self._channels[channel] = handler
+    
+    def add(self, token_id: str):
+        now = time.monotonic()
+        self._revoked[token_id] = now + self.ttl
+        for listener in self._listeners:
+            listener(token_id)
+        if len(self._revoked) > 1024 and len(self._revoked) % 1024 == 0:
+            self._revoked = {jti: until for jti, until in self._revoked.items() if until > now}
+    
+    def might_contain(self, token_id: str) -> bool:
+        until = self._revoked.get(token_id)
+        return until is not None and until > time.monotonic()
+    
+    async def _load_snapshot(self):
+        async for key in self.client.scan_iter(count=1000):
+            self.add(key.decode() if isinstance(key, bytes) else key)
+    
+    async def _run(self):
+        backoff = 1
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                # Subscribe before the snapshot so revocations made while scanning are not lost.
+                await pubsub.subscribe(BLOCKLIST_CHANNEL, *self._channels)
+                await self._load_snapshot()
+                for handler in self._channels.values():
+                    handler(None)
+                self.ready = True
+                backoff = 1
+                while True:
+                    # Bounded reads, `REDIS_SOCKET_TIMEOUT` is meant for commands, not for an idle channel.
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        channel, data = (
+                            value.decode() if isinstance(value, bytes) else value
+                            for value in (message["channel"], message["data"])
+                        )
+                        if channel == BLOCKLIST_CHANNEL:
+                            self.add(data)
+                        else:
+                            self._channels[channel](data)
+            except REDIS_ERRORS as e:
+                logger.warning("Token blocklist mirror lost its subscription: %s", e)
+            finally:
+                self.ready = False
+                await pubsub.aclose()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+    
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "size": len(self._revoked),
+            "local_negatives": self.local_negatives,
+            "remote_lookups": self.remote_lookups,
+            "unavailable": self.unavailable,
+        }
+
+
+blocklist_mirror = BlocklistMirror(
+    client=token_block_list,
+    ttl=settings.TOKEN_EXP,
+    fail_open=settings.TOKEN_BLOCKLIST_FAIL_OPEN
 )
 
 
 async def add_token_to_blocklist(token_id: str):
-    return await token_block_list.set(name=token_id, value="removed", ex=settings.TOKEN_EXP)
+    blocklist_mirror.add(token_id)
+    try:
+        async with pipeline(TOKEN_BLOCKLIST_DB, blocklist_mirror.breaker, transaction=True) as pipe:
+            pipe.set(name=token_id, value="removed", ex=settings.TOKEN_EXP)
+            pipe.publish(BLOCKLIST_CHANNEL, token_id)
+            result, _ = await pipe.execute()
+    except REDIS_ERRORS as e:
+        # Only this worker knows about the revocation, the client has to retry the logout.
+        logger.warning("Token revocation could not be stored: %r", e)
+        raise ServerOverloaded("Token revocation unavailable, retry later.", settings.OVERLOAD_RETRY_AFTER)
+    return result
 
 
 async def get_token_in_blocklist(token_id: str):
-    token_id_exists = await token_block_list.get(token_id)
-    print(f"{token_id_exists = }")
-    return token_id_exists
\ No newline at end of file
+    if blocklist_mirror.ready and not blocklist_mirror.might_contain(token_id):
+        blocklist_mirror.local_negatives += 1
+        return None
+    
+    blocklist_mirror.remote_lookups += 1
+    try:
+        return await blocklist_mirror.breaker.call(lambda: token_block_list().get(token_id))
+    except REDIS_ERRORS as e:
+        blocklist_mirror.unavailable += 1
+        if not isinstance(e, CircuitOpen):
+            logger.warning("Token blocklist lookup failed: %r", e)
+        if not blocklist_mirror.fail_open:
+            raise ServerOverloaded("Token revocation check unavailable, retry later.", settings.OVERLOAD_RETRY_AFTER)
+        return token_id if blocklist_mirror.might_contain(token_id) else None
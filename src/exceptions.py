@@ -1,3 +1,6 @@
+from fastapi import FastAPI, status
+from fastapi.requests import Request
+from fastapi.responses import JSONResponse
 
 
 class SecuredServerException(Exception):
@@ -8,4 +11,62 @@ class InvalidToken(SecuredServerException):
     """
     Provided Token is invalid or has expired.
     """
-    pass
\ No newline at end of file
+    pass
+
+class InvalidCursor(SecuredServerException):
+    """
+    Provided pagination cursor could not be decoded.
+    """
+    pass
+
+class PreconditionFailed(SecuredServerException):
+    """
+    The `If-Match` entity tag does not match the current version of the resource.
+    """
+    pass
+
+class ServerOverloaded(SecuredServerException):
+    """
+    A bounded resource (worker pool, queue) is saturated, the client should retry later.
+    """
+    
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimited(SecuredServerException):
+    """
+    The caller exceeded a rate limit, `headers` carries the `RateLimit-*` state of the tightest limit.
+    """
+    
+    def __init__(self, message: str, retry_after: int, headers: dict):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.headers = headers
+
+
+def register_exception_handlers(app: FastAPI):
+    
+    @app.exception_handler(InvalidCursor)
+    async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+    @app.exception_handler(PreconditionFailed)
+    async def precondition_failed_handler(request: Request, exc: PreconditionFailed):
+        return JSONResponse(status_code=status.HTTP_412_PRECONDITION_FAILED, content={"detail": str(exc)})
+
+    @app.exception_handler(ServerOverloaded)
+    async def server_overloaded_handler(request: Request, exc: ServerOverloaded):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": str(exc)},
+            headers={"Retry-After": str(exc.retry_after)}
+        )
+
+    @app.exception_handler(RateLimited)
+    async def rate_limited_handler(request: Request, exc: RateLimited):
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": str(exc)},
+            headers={**exc.headers, "Retry-After": str(exc.retry_after)}
+        )
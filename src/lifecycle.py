@@ -0,0 +1,91 @@
+from typing import Optional
+import asyncio
+import logging
+import os
+import resource
+import time
+
+from src.auth.utils import password_hasher, create_access_token, decode_token, decoded_token_cache
+from src.db.db_agent import get_engine, get_replica_router
+from src.db.redis import redis_clients
+from src.utils.config import settings
+
+
+logger = logging.getLogger("secured_server")
+
+
+class WorkerStats:
+    """ Startup time and memory of this worker process, reported once ready and through the metrics. """
+
+    def __init__(self):
+        self.imported = time.perf_counter()
+        self.startup_seconds: Optional[float] = None
+
+    def _process_age(self) -> float:
+        """ Seconds since the process started, from /proc on Linux, since this module's import elsewhere. """
+        try:
+            with open("/proc/self/stat") as stat:
+                start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+            with open("/proc/uptime") as uptime:
+                return float(uptime.read().split()[0]) - start_ticks / os.sysconf("SC_CLK_TCK")
+        except (OSError, ValueError, IndexError):
+            return time.perf_counter() - self.imported
+
+    def ready(self):
+        self.startup_seconds = self._process_age()
+
+    @staticmethod
+    def rss_bytes() -> Optional[int]:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "startup_seconds": round(self.startup_seconds or 0.0, 3),
+            "rss_bytes": self.rss_bytes() or 0,
+            # ru_maxrss is in KiB on Linux.
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        }
+
+
+worker_stats = WorkerStats()
+
+
+async def _warm_engine(engine, connections: int):
+    """ Opens `connections` connections at once, they stay in the pool once closed. """
+    results = await asyncio.gather(*[engine.connect().start() for _ in range(connections)], return_exceptions=True)
+    for result in results:
+        if not isinstance(result, BaseException):
+            await result.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def warmup():
+    """
+    Pays the first-request costs before the worker accepts traffic: database connections, Redis
+    connections, the bcrypt backend and hashing threads, and the JWT signing path. A failing or
+    slow step is logged and skipped, the request path still connects lazily.
+    """
+    connections = min(settings.WARMUP_DB_CONNECTIONS, settings.DB_POOL_SIZE)
+    steps = {
+        "database": lambda: [_warm_engine(engine, connections) for engine in [get_engine(), *get_replica_router().engines]],
+        "redis": lambda: [client.ping() for client in redis_clients()],
+        "password_hashing": lambda: [password_hasher.warmup()],
+    }
+    for name, awaitables in steps.items():
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.gather(*awaitables()), settings.WARMUP_TIMEOUT)
+        except Exception as e:
+            logger.warning("Warmup of %s failed: %r", name, e)
+            continue
+        logger.debug("Warmed up %s in %.3fs", name, time.perf_counter() - start)
+    
+    claims = decode_token(create_access_token({"email": "warmup", "user_uid": "warmup", "role": "warmup"}, expiry=60))
+    decoded_token_cache.evict_jti(claims["jti"])
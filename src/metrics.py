@@ -0,0 +1,162 @@
+from typing import Callable, Dict, Iterable, Tuple
+import bisect
+import math
+
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: Dict[LabelValues, float] = {}
+        
+    def inc(self, *label_values: str, amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+    
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    
+    def dec(self, *label_values: str, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+    
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """ Prometheus style cumulative histogram that can also estimate quantiles from its buckets. """
+    
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series: Dict[LabelValues, list] = {}
+        
+    def observe(self, value: float, *label_values: str):
+        series = self.series.get(label_values)
+        if series is None:
+            # [bucket counts (last one is +Inf), sum, count]
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+    
+    def quantile(self, q: float, *label_values: str) -> float:
+        series = self.series.get(label_values)
+        if not series or not series[2]:
+            return math.nan
+        rank = q * series[2]
+        seen = 0
+        for index, count in enumerate(series[0]):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, observations) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels + ('le',), label_values + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {observations}")
+        return lines
+
+
+class MetricsRegistry:
+    
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.metrics: list = []
+        self.collectors: Dict[str, Callable[[], dict]] = {}
+        
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(f"{self.namespace}_{name}", documentation, labels)
+        self.metrics.append(metric)
+        return metric
+    
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(f"{self.namespace}_{name}", documentation, labels)
+        self.metrics.append(metric)
+        return metric
+    
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(f"{self.namespace}_{name}", documentation, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+    
+    def register_collector(self, name: str, collect: Callable[[], dict]):
+        """ `collect` returns flat numeric stats, or one level of `{label: {stat: value}}`. """
+        self.collectors[name] = collect
+    
+    def _render_collector(self, name: str, stats: dict) -> list[str]:
+        lines = []
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                for stat, sub_value in value.items():
+                    lines.append(f'{self.namespace}_{name}_{stat}{_format_labels(("key",), (key,))} {float(sub_value)}')
+            elif isinstance(value, (int, float, bool)):
+                lines.append(f"{self.namespace}_{name}_{key} {float(value)}")
+        return lines
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, collect in self.collectors.items():
+            lines.extend(self._render_collector(name, collect()))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry("secured_server")
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route")
+)
+REQUESTS_TOTAL = registry.counter(
+    "http_requests_total", "Requests by route template and status code.", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently being served."
+)
+REQUEST_LATENCY_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _collect_latency_quantiles() -> dict:
+    return {
+        f"{method} {route}": {f"p{int(q * 100)}": REQUEST_LATENCY.quantile(q, method, route) for q in REQUEST_LATENCY_QUANTILES}
+        for method, route in REQUEST_LATENCY.series
+    }
+
+
+registry.register_collector("http_request_duration_seconds", _collect_latency_quantiles)
@@ -1,19 +1,158 @@
 from fastapi import FastAPI
-from fastapi.requests import Request
-from typing import Callable
-import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import logging
+import random
+import time
 
+from src.db.db_agent import get_replica_router
+from src.db.profiler import RequestProfile, current_profile
+from src.metrics import REQUEST_LATENCY, REQUESTS_TOTAL, REQUESTS_IN_FLIGHT
+from src.utils.config import settings
 
-# logger = logging.getLogger("uvicorn.access")
-# logger.disabled = True
 
-def register_middelware(app: FastAPI):
+logger = logging.getLogger("secured_server.access")
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the matched route, with the prefix of the router it was included with. Such
+    routes only know their own path, the prefix is the part of the request path in front of what
+    the route's own pattern matches.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    template = getattr(route, "path_format", None) or getattr(route, "path", "unmatched")
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is not None:
+        path = scope["path"]
+        for index, char in enumerate(path):
+            if char == "/" and path_regex.match(path[index:]):
+                return path[:index] + template
+    return template
+
+
+class TelemetryMiddleware:
+    """
+    Times every request with the monotonic high resolution clock, feeds the per route latency
+    histogram and in-flight gauge, and writes a sampled structured access log. Errors and slow
+    requests are always logged. The SQL profile of the request (query count, database time) is
+    added to the access log and, when enabled, to a `Server-Timing` response header.
+    """
+    
+    def __init__(self, app: ASGIApp, sample_rate: float, slow_request_seconds: float, server_timing: bool = True):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_seconds = slow_request_seconds
+        self.server_timing = server_timing
+        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter_ns()
+        status_code = 500
+        profile = RequestProfile(scope["path"])
+        
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    message["headers"] = [
+                        *message.get("headers", []), (b"server-timing", self._server_timing(profile, start))
+                    ]
+            await send(message)
+        
+        REQUESTS_IN_FLIGHT.inc()
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            REQUESTS_IN_FLIGHT.dec()
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            route_path = route_template(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.observe(elapsed, method, route_path)
+            REQUESTS_TOTAL.inc(method, route_path, str(status_code))
+            
+            if status_code >= 500 or elapsed >= self.slow_request_seconds or random.random() < self.sample_rate:
+                logger.info(
+                    "request",
+                    extra={
+                        "method": method,
+                        "route": route_path,
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "db_queries": profile.queries,
+                        "db_ms": round(profile.db_seconds * 1000, 3),
+                        "db_slowest_ms": round(profile.slowest_seconds * 1000, 3),
+                    }
+                )
     
-    @app.middleware("http")
-    async def custom_logging(request: Request, func_call: Callable):
-        start = time.time()
-        print(f"Calling Function - {func_call.__name__} for request - {request.url}")
-        response = await func_call(request)
-        print(f"Function Executed in {time.time() - start} seconds.")
-        return response
\ No newline at end of file
+    @staticmethod
+    def _server_timing(profile: RequestProfile, start: int) -> bytes:
+        app_ms = (time.perf_counter_ns() - start) / 1e6
+        return (
+            f'db;dur={profile.db_seconds * 1000:.3f};desc="{profile.queries} queries", '
+            f'db-slowest;dur={profile.slowest_seconds * 1000:.3f}, app;dur={app_ms:.3f}'
+        ).encode()
+
+
+class RateLimitHeadersMiddleware:
+    """ Adds the `RateLimit-*` headers computed by the `RateLimit` dependency to whatever response the route returns. """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                rate_limit_headers = scope.get("state", {}).get("rate_limit_headers")
+                if rate_limit_headers:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        *[(name.lower().encode(), value.encode()) for name, value in rate_limit_headers.items()]
+                    ]
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+
+
+class ReadYourWritesMiddleware:
+    """ Shares the read your writes pin of a request that wrote, before its response reaches the client. """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                pinned_user = scope.get("state", {}).get("pinned_user")
+                if pinned_user:
+                    await get_replica_router().share_pin(pinned_user)
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+
+
+def register_middelware(app: FastAPI):
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(RateLimitHeadersMiddleware)
+    app.add_middleware(
+        TelemetryMiddleware,
+        sample_rate=settings.LOG_SAMPLE_RATE,
+        slow_request_seconds=settings.SLOW_REQUEST_SECONDS,
+        server_timing=settings.SERVER_TIMING_ENABLED
+    )
@@ -0,0 +1,330 @@
+from fastapi import Request
+from redis.exceptions import RedisError
+from collections import OrderedDict
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import math
+import time
+
+from src.db.redis import CircuitBreaker, CircuitOpen, circuit_breaker, rate_limit_client
+from src.exceptions import RateLimited, ServerOverloaded
+from src.utils.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Sliding window counter over every limit of a request at once: KEYS are (current, previous) window
+# pairs, ARGV (limit, window_ms, elapsed_ms, lease) quadruples. When every limit has room for the hit,
+# each key is charged up to `lease` permits (at least the hit itself) that the worker spends locally.
+_SLIDING_WINDOW = """
+local n = #KEYS / 2
+local allowed = 1
+local counts = {}
+for i = 1, n do
+    local limit = tonumber(ARGV[i * 4 - 3])
+    local window = tonumber(ARGV[i * 4 - 2])
+    local elapsed = tonumber(ARGV[i * 4 - 1])
+    local current = tonumber(redis.call('GET', KEYS[i * 2 - 1]) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[i * 2]) or '0')
+    local free = math.floor(limit - previous * (window - elapsed) / window - current)
+    counts[i] = {current, previous, free}
+    if free < 1 then
+        allowed = 0
+    end
+end
+local result = {allowed}
+for i = 1, n do
+    local granted = 0
+    if allowed == 1 then
+        granted = math.min(tonumber(ARGV[i * 4]), counts[i][3])
+        redis.call('INCRBY', KEYS[i * 2 - 1], granted)
+        redis.call('PEXPIRE', KEYS[i * 2 - 1], tonumber(ARGV[i * 4 - 2]) * 2)
+        counts[i][1] = counts[i][1] + granted
+    end
+    result[#result + 1] = counts[i][1]
+    result[#result + 1] = counts[i][2]
+    result[#result + 1] = granted
+end
+return result
+"""
+
+
+def parse_limit(spec: str) -> Optional[Tuple[int, int]]:
+    """ `"10/minute"` -> `(10, 60)`, an empty spec disables the limit. """
+    if not spec:
+        return None
+    count, _, period = spec.partition("/")
+    return int(count), PERIODS[period.strip()]
+
+
+def default_rules() -> Dict[str, Dict[str, Optional[Tuple[int, int]]]]:
+    return {
+        "login": {
+            "ip": parse_limit(settings.RATE_LIMIT_LOGIN_PER_IP),
+            "email": parse_limit(settings.RATE_LIMIT_LOGIN_PER_EMAIL),
+        },
+        "signup": {"ip": parse_limit(settings.RATE_LIMIT_SIGNUP_PER_IP)},
+        "write": {"uid": parse_limit(settings.RATE_LIMIT_WRITE_PER_USER)},
+    }
+
+
+class LimitState:
+    """ Outcome of one limit for one key: window usage and when the caller may retry. """
+
+    def __init__(self, limit: int, window: int, elapsed: float, current: int, previous: int):
+        self.limit = limit
+        self.window = window
+        self.used = previous * (window - elapsed) / window + current
+        self.remaining = max(0, math.floor(limit - self.used))
+        self.reset = math.ceil(window - elapsed)
+        self.retry_after = max(1, math.ceil(self._seconds_until_allowed(limit, window, elapsed, current, previous)))
+
+    @staticmethod
+    def _seconds_until_allowed(limit: int, window: int, elapsed: float, current: int, previous: int) -> float:
+        """ Time until one more hit fits, assuming no other hits meanwhile. """
+        if current + 1 <= limit and previous:
+            # Within this window, once the weighted previous window has drained enough.
+            return max(0.0, (window - elapsed) - (limit - 1 - current) * window / previous)
+        # In the next window `current` becomes the weighted previous count and has to drain in turn.
+        drain = max(0.0, window - (limit - 1) * window / current) if current else 0.0
+        return (window - elapsed) + drain
+
+
+class LocalWindows:
+    """
+    Per worker copy of the sliding windows, of the keys Redis denied and of the permits leased from
+    Redis. A key this worker alone has exhausted, or that is still inside a known denial, is
+    rejected without a Redis round-trip, one with leased permits left is allowed without one.
+    Bounded LRU, evicted keys simply fall back to Redis.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._entries: OrderedDict[str, list] = OrderedDict()
+
+    def _entry(self, key: str, window_index: int) -> list:
+        # [window index, current count, previous count, denied until, leased permits, remaining after the lease]
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [window_index, 0, 0, 0.0, 0, 0]
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        if entry[0] != window_index:
+            entry[2] = entry[1] if entry[0] == window_index - 1 else 0
+            # Leases are charged to the window they were granted in.
+            entry[0], entry[1], entry[4] = window_index, 0, 0
+        return entry
+
+    def state(self, key: str, limit: int, window: int, now: float) -> Tuple[LimitState, float]:
+        entry = self._entry(key, int(now // window))
+        return LimitState(limit, window, now % window, entry[1], entry[2]), entry[3]
+
+    def hit(self, key: str, window: int, now: float):
+        self._entry(key, int(now // window))[1] += 1
+
+    def deny(self, key: str, window: int, now: float, until: float):
+        entry = self._entry(key, int(now // window))
+        entry[3] = max(entry[3], until)
+
+    def lease(self, key: str, window: int, now: float, permits: int, remaining: int):
+        """ Records `permits` granted by Redis, `remaining` is what the window had left beyond them. """
+        entry = self._entry(key, int(now // window))
+        entry[4], entry[5] = permits, remaining
+
+    def leased(self, key: str, window: int, now: float) -> int:
+        return self._entry(key, int(now // window))[4]
+
+    def spend(self, key: str, window: int, now: float) -> int:
+        """ Uses one leased permit, returns the remaining quota as seen by the client. """
+        entry = self._entry(key, int(now // window))
+        entry[1] += 1
+        entry[4] -= 1
+        return entry[5] + entry[4]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RateLimiter:
+    """
+    Distributed sliding window rate limiter. Each request checks all of its keys (ip, email, uid)
+    in one atomic script call, after a local pre-filter that absorbs abusive bursts in process.
+    An allowed call leases up to `lease_fraction` of each limit to the worker, so the following hits
+    of that key are served from the lease without a round-trip. The price is that up to one lease
+    per worker and key can go unspent in a window and still count against the limit. When Redis
+    is slow or down, or its circuit breaker is open, the local windows keep enforcing the limits
+    per worker and the request is let through (`RATE_LIMIT_FAIL_OPEN`) or rejected with a 503.
+    """
+
+    def __init__(self, client: Callable, rules: dict, enabled: bool = True, fail_open: bool = True,
+                 timeout: float = 0.05, local_keys: int = 10000, lease_fraction: float = 0.1,
+                 breaker: Optional[CircuitBreaker] = None):
+        self._client = client
+        self.breaker = breaker or circuit_breaker("rate_limit")
+        self.rules = rules
+        self.enabled = enabled
+        self.fail_open = fail_open
+        self.timeout = timeout
+        self.local = LocalWindows(local_keys)
+        self.lease_fraction = lease_fraction
+        self.allowed = 0
+        self.leased = 0
+        self.denied_local = 0
+        self.denied_remote = 0
+        self.redis_errors = 0
+
+    @cached_property
+    def _sliding_window(self):
+        return self._client().register_script(_SLIDING_WINDOW)
+
+    @staticmethod
+    def _key(rule: str, dimension: str, value: str) -> str:
+        # Hashed so emails and addresses are not stored in Redis in clear.
+        digest = hashlib.blake2b(value.encode(), digest_size=12).hexdigest()
+        return f"rl:{rule}:{dimension}:{digest}"
+
+    @staticmethod
+    def headers(states: List[LimitState]) -> Dict[str, str]:
+        tightest = min(states, key=lambda state: (state.remaining, -state.reset))
+        return {
+            "RateLimit-Limit": str(tightest.limit),
+            "RateLimit-Remaining": str(tightest.remaining),
+            "RateLimit-Reset": str(tightest.reset),
+        }
+
+    def _spend(self, limits: list, now: float) -> Dict[str, str]:
+        quotas = [
+            (limit, self.local.spend(key, window, now), math.ceil(window - now % window))
+            for key, (limit, window) in limits
+        ]
+        self.allowed += 1
+        limit, remaining, reset = min(quotas, key=lambda quota: (quota[1], -quota[2]))
+        return {"RateLimit-Limit": str(limit), "RateLimit-Remaining": str(remaining), "RateLimit-Reset": str(reset)}
+
+    def _deny(self, states: List[LimitState]):
+        retry_after = max(state.retry_after for state in states if state.used + 1 > state.limit)
+        raise RateLimited("Too many requests, slow down.", retry_after, self.headers(states))
+
+    async def hit(self, rule: str, values: Dict[str, str]) -> Dict[str, str]:
+        """ Counts one hit of `rule` for the given dimension values, returns the `RateLimit-*` headers. """
+        limits = [
+            (self._key(rule, dimension, value), limit)
+            for dimension, value in values.items()
+            if value and (limit := self.rules.get(rule, {}).get(dimension))
+        ]
+        if not self.enabled or not limits:
+            return {}
+
+        now = time.time()
+        local_states = []
+        for key, (limit, window) in limits:
+            state, denied_until = self.local.state(key, limit, window, now)
+            if denied_until > now:
+                state.retry_after = math.ceil(denied_until - now)
+                state.used = limit
+            local_states.append(state)
+        if any(state.used + 1 > state.limit for state in local_states):
+            self.denied_local += 1
+            self._deny(local_states)
+
+        # Only keys without leased permits left need Redis, the others are spent once the hit is allowed.
+        remote = [(key, (limit, window)) for key, (limit, window) in limits if not self.local.leased(key, window, now)]
+        if not remote:
+            self.leased += 1
+            return self._spend(limits, now)
+
+        try:
+            keys, args = [], []
+            for key, (limit, window) in remote:
+                window_index = int(now // window)
+                keys += [f"{key}:{window_index}", f"{key}:{window_index - 1}"]
+                args += [limit, window * 1000, int((now % window) * 1000), max(1, int(limit * self.lease_fraction))]
+            result = await self.breaker.call(lambda: asyncio.wait_for(
+                self._sliding_window(keys=keys, args=args, client=self._client()), self.timeout
+            ))
+        except (RedisError, asyncio.TimeoutError, OSError) as e:
+            self.redis_errors += 1
+            if not isinstance(e, CircuitOpen):
+                logger.warning("Rate limiter unavailable for %s: %s", rule, e)
+            if not self.fail_open:
+                raise ServerOverloaded("Rate limiter unavailable, retry later.", settings.OVERLOAD_RETRY_AFTER)
+            for key, (limit, window) in limits:
+                self.local.hit(key, window, now)
+            self.allowed += 1
+            return self.headers([self.local.state(key, limit, window, now)[0] for key, (limit, window) in limits])
+
+        allowed, counts = result[0], result[1:]
+        states = [
+            LimitState(limit, window, now % window, int(counts[i * 3]), int(counts[i * 3 + 1]))
+            for i, (_, (limit, window)) in enumerate(remote)
+        ]
+        if not allowed:
+            self.denied_remote += 1
+            for (key, (limit, window)), state in zip(remote, states):
+                if state.used + 1 > state.limit:
+                    self.local.deny(key, window, now, now + state.retry_after)
+            self._deny(states)
+
+        for i, ((key, (limit, window)), state) in enumerate(zip(remote, states)):
+            self.local.lease(key, window, now, int(counts[i * 3 + 2]), state.remaining)
+        return self._spend(limits, now)
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "denied_local": self.denied_local,
+            "leased": self.leased,
+            "denied_remote": self.denied_remote,
+            "redis_errors": self.redis_errors,
+            "local_keys": len(self.local),
+        }
+
+
+rate_limiter = RateLimiter(
+    client=rate_limit_client,
+    rules=default_rules(),
+    enabled=settings.RATE_LIMIT_ENABLED,
+    fail_open=settings.RATE_LIMIT_FAIL_OPEN,
+    timeout=settings.RATE_LIMIT_REDIS_TIMEOUT,
+    local_keys=settings.RATE_LIMIT_LOCAL_KEYS,
+    lease_fraction=settings.RATE_LIMIT_LEASE_FRACTION
+)
+
+
+class RateLimit:
+    """
+    Route dependency applying a rule of `rate_limiter`, e.g. `Depends(RateLimit("login"))`. The `uid`
+    dimension reads the access token parsed earlier in the request, so it must come after the
+    token bearer dependency.
+    """
+
+    def __init__(self, rule: str, limiter: RateLimiter = rate_limiter):
+        self.rule = rule
+        self.limiter = limiter
+        self.dimensions = limiter.rules.get(rule, {})
+
+    async def _values(self, request: Request) -> Dict[str, str]:
+        values = {}
+        if "ip" in self.dimensions:
+            values["ip"] = request.client.host if request.client else "unknown"
+        if "email" in self.dimensions:
+            try:
+                body = await request.json()
+                values["email"] = str(body.get("email", "")).lower()
+            except (ValueError, AttributeError):
+                pass
+        if "uid" in self.dimensions:
+            parsed_token = getattr(request.state, "parsed_token", None)
+            if parsed_token:
+                values["uid"] = parsed_token[1]["user"]["user_uid"]
+        return values
+
+    async def __call__(self, request: Request):
+        request.state.rate_limit_headers = await self.limiter.hit(self.rule, await self._values(request))
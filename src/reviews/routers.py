@@ -1,31 +1,55 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
 from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Literal
+from uuid import UUID
 
-from src.db.db_agent import get_session
-from src.auth.dependencies import get_current_auth_user, AccessTokenBearer
-from src.reviews.schemas import ReviewCreateModel
+from src.db.db_agent import get_session, get_read_session
+from src.auth.dependencies import get_current_auth_user, AccessTokenBearer, RoleChecker
+from src.db.models import ROLES
+from src.reviews.schemas import ReviewCreateModel, ReviewModel
+from src.utils.pagination import Page, PageParams
+from src.utils.serialization import dump_page
 from src.reviews.services import ReviewService
-from src.db.models import User
+from src.auth.schemas import Principal
+from src.rate_limit import RateLimit
 
 
 review_router = APIRouter()
 
 review_services = ReviewService()
 access_token_bearer = AccessTokenBearer()
+role_checker = Depends(
+    RoleChecker([ROLES.USER.value, ROLES.ADMIN.value])
+)
+
+
+@review_router.get("/book/{book_uid}", response_model=Page[ReviewModel], dependencies=[role_checker])
+async def get_reviews_for_book(
+    book_uid: UUID,
+    sort: Literal["rating", "recent"] = Query(default="rating"),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+    access_user_details: dict = Depends(access_token_bearer)
+    ):
+    
+    data = await review_services.get_reviews_for_book(
+        book_uid=book_uid, session=session, limit=page.limit, cursor=page.cursor, sort=sort
+    )
+    return Response(content=dump_page(ReviewModel, data), media_type="application/json")
 
 
 @review_router.post("/book/{book_uid}")
 async def add_review_to_book(
-    book_uid: str,
+    book_uid: UUID,
     review_data: ReviewCreateModel,
-    user_details: User = Depends(get_current_auth_user),
+    user_details: Principal = Depends(get_current_auth_user),
+    _: None = Depends(RateLimit("write")),
     session: AsyncSession = Depends(get_session)
     ):
     
-    print("\n\n\n\n\n")
-    print("Hi")
     new_review_details = await review_services.add_reviews_for_book(
-        user_email=user_details.email, book_uid=book_uid, review_data=review_data, session=session
+        user_uid=user_details.uid, book_uid=book_uid, review_data=review_data, session=session
     )
     return new_review_details
     
\ No newline at end of file
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict, Field
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict
 
 
 
@@ -14,8 +14,18 @@ class ReviewModel(BaseModel):
     created_at: datetime
     updated_at: datetime
     
+    model_config = ConfigDict(from_attributes=True)
+    
 
 class ReviewCreateModel(BaseModel):
     rating: int = Field(le=5, ge=0)
     review_text: str
-    
\ No newline at end of file
+
+
+class RatingSummaryModel(BaseModel):
+    review_count: int = 0
+    rating_sum: int = 0
+    average_rating: float = 0.0
+    histogram: Dict[int, int] = Field(default_factory=lambda: {rating: 0 for rating in range(6)})
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -1,36 +1,118 @@
 from sqlmodel import select, desc
+from sqlalchemy import tuple_, literal, exc
 from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException, status
+from datetime import datetime
+from typing import Optional
+from uuid import UUID, uuid4
 
-from src.reviews.schemas import ReviewModel
-from src.db.models import Reviews, User, Books
-from src.auth.services import UserService
-from src.books.services import BookService
+from src.reviews.schemas import ReviewCreateModel
+from src.db.models import Reviews, Books, BookRatingSummary
+from src.db.db_agent import dialect_insert
+from src.db.cache import response_cache
+from src.utils.pagination import decode_cursor, build_page
 
 
-user_service = UserService()
-book_service = BookService()
-
 class ReviewService:
     
-    async def get_reviews_for_book(self, book_uid: str, session: AsyncSession):
-        statement = select(Reviews).where(Reviews.book_uid == book_uid).order_by(desc(Reviews.rating))
-        reviews = await session.exec(statement)
-        return reviews
+    async def get_reviews_for_book(
+        self, book_uid: str, session: AsyncSession, limit: int, cursor: Optional[str] = None, sort: str = "rating"
+    ):
+        statement = select(Reviews).where(Reviews.book_uid == book_uid)
+        if sort == "rating":
+            key_columns = (Reviews.rating, Reviews.created_at, Reviews.uid)
+            parsers = (int, datetime.fromisoformat, UUID)
+        else:
+            key_columns = (Reviews.created_at, Reviews.uid)
+            parsers = (datetime.fromisoformat, UUID)
+        
+        statement = statement.order_by(*[desc(column) for column in key_columns]).limit(limit + 1)
+        if cursor:
+            statement = statement.where(tuple_(*key_columns) < tuple(decode_cursor(cursor, *parsers)))
+        
+        result = await session.exec(statement)
+        return build_page(
+            result.all(), limit, lambda review: tuple(getattr(review, column.key) for column in key_columns)
+        )
+    
+    async def get_rating_summary(self, book_uid: str, session: AsyncSession) -> BookRatingSummary|None:
+        statement = select(BookRatingSummary).where(BookRatingSummary.book_uid == book_uid)
+        result = await session.exec(statement)
+        return result.first()
     
-    async def add_reviews_for_book(self, user_email: str, book_uid: str, review_data: ReviewModel, session: AsyncSession):
+    def _rating_summary_upsert(self, statement, rating: int):
+        """ Turns the dialect `insert()` of a summary row into an `ON CONFLICT` increment of its counters. """
+        table = BookRatingSummary.__table__
+        rating_column = f"rating_{rating}"
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.book_uid],
+            set_={
+                "review_count": table.c.review_count + 1,
+                "rating_sum": table.c.rating_sum + rating,
+                rating_column: table.c[rating_column] + 1,
+            }
+        )
+    
+    def _insert_review_statement(self, insert, user_uid: UUID, book_uid: UUID, review_data: ReviewCreateModel):
+        """ `INSERT INTO reviews ... SELECT ... FROM books WHERE uid = :book_uid RETURNING *`, no row when the book is missing. """
+        table = Reviews.__table__
+        now = datetime.now()
+        values = {
+            "uid": uuid4(), "rating": review_data.rating, "review_text": review_data.review_text,
+            "user_uid": user_uid, "created_at": now, "updated_at": now,
+        }
+        source = select(
+            *[literal(value, table.c[name].type).label(name) for name, value in values.items()], Books.uid
+        ).where(Books.uid == book_uid)
+        return insert(table).from_select([*values, "book_uid"], source).returning(*table.c)
+    
+    async def add_reviews_for_book(
+        self, user_uid: UUID, book_uid: UUID, review_data: ReviewCreateModel, session: AsyncSession
+    ) -> dict:
+        """
+        Validates the book inside the insert itself instead of loading the user and the book first.
+        On PostgreSQL the review and the rating summary upsert are a single statement chained
+        through a data-modifying CTE, other dialects run the upsert after the returned row.
+        """
+        insert = dialect_insert(session)
+        summary_table = BookRatingSummary.__table__
+        rating_column = f"rating_{review_data.rating}"
+        statement = self._insert_review_statement(insert, user_uid, book_uid, review_data)
         
-        user = await user_service.get_user_by_email(email=user_email, session=session)
-        book = await book_service.get_book(book_id=book_uid, session=session)
+        try:
+            if session.bind.dialect.name == "postgresql":
+                new_review = statement.cte("new_review")
+                summary = self._rating_summary_upsert(
+                    insert(summary_table).from_select(
+                        ["book_uid", "review_count", "rating_sum", rating_column],
+                        select(new_review.c.book_uid, literal(1), literal(review_data.rating), literal(1)),
+                        # The other rating columns take their server default, not a NULL bound parameter.
+                        include_defaults=False
+                    ),
+                    review_data.rating
+                ).cte("rating_summary")
+                result = await session.execute(select(new_review).add_cte(summary))
+                new_review_data = result.mappings().first()
+            else:
+                result = await session.execute(statement)
+                new_review_data = result.mappings().first()
+                if new_review_data:
+                    await session.execute(self._rating_summary_upsert(
+                        insert(summary_table).values(
+                            book_uid=book_uid, review_count=1, rating_sum=review_data.rating, **{rating_column: 1}
+                        ),
+                        review_data.rating
+                    ))
+        except exc.IntegrityError:
+            # FK violation, the user or the book was deleted while the statement ran.
+            await session.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found.")
         
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
-        if not book:
+        if not new_review_data:
+            await session.rollback()
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found.")
         
-        new_review_data = Reviews(**review_data.model_dump())
-        new_review_data.book = book
-        new_review_data.user = user
-        session.add(new_review_data)
+        new_review_data = dict(new_review_data)
         await session.commit()
+        await response_cache.invalidate(f"book:{book_uid}")
         return new_review_data
\ No newline at end of file
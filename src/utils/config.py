@@ -7,7 +7,71 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 0.5
+    REDIS_CONNECT_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 0.5
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_RETRIES: int = 2
+    REDIS_RETRY_BACKOFF_BASE: float = 0.01
+    REDIS_RETRY_BACKOFF_CAP: float = 0.1
+    REDIS_BREAKER_FAILURES: int = 5
+    REDIS_BREAKER_RESET_SECONDS: float = 5.0
+    TOKEN_BLOCKLIST_FAIL_OPEN: bool = True
     TOKEN_EXP: int = 3600
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_STRATEGY: str = "round_robin"
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 200
+    JWT_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30.0
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    OVERLOAD_RETRY_AFTER: int = 1
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 0.01
+    SLOW_REQUEST_SECONDS: float = 1.0
+    SLOW_QUERY_SECONDS: float = 0.25
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    SQL_PROFILER_MAX_STATEMENTS: int = 1000
+    SERVER_TIMING_ENABLED: bool = True
+    SQL_DEBUG_ENDPOINT: bool = False
+    WEB_WORKERS: int = 0
+    SHUTDOWN_GRACE_SECONDS: int = 30
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 4
+    WARMUP_TIMEOUT: float = 5.0
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+    SEARCH_MIN_PREFIX_LENGTH: int = 3
+    SEARCH_MAX_MATCHES: int = 1000
+    BOOK_DETAIL_EMBED_REVIEWS: bool = True
+    FAST_JSON_RESPONSES: bool = False
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 300
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_FAIL_OPEN: bool = True
+    RATE_LIMIT_REDIS_TIMEOUT: float = 0.05
+    RATE_LIMIT_LOCAL_KEYS: int = 10000
+    RATE_LIMIT_LEASE_FRACTION: float = 0.1
+    RATE_LIMIT_LOGIN_PER_IP: str = "60/minute"
+    RATE_LIMIT_LOGIN_PER_EMAIL: str = "10/minute"
+    RATE_LIMIT_SIGNUP_PER_IP: str = "20/hour"
+    RATE_LIMIT_WRITE_PER_USER: str = "120/minute"
+    SCHEMA_STARTUP_MODE: str = "create"
+    
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
     
     model_config = SettingsConfigDict(
         env_file=".env",
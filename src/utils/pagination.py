@@ -0,0 +1,60 @@
+from pydantic import BaseModel
+from fastapi import Query
+from typing import Any, Callable, Generic, List, Optional, Sequence, TypeVar
+from datetime import datetime, date
+from uuid import UUID
+import base64
+import json
+
+from src.exceptions import InvalidCursor
+from src.utils.config import settings
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class PageParams:
+    
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(default=None, description="Opaque cursor returned as `next_cursor` by the previous page."),
+        limit: int = Query(default=settings.PAGE_SIZE_DEFAULT, ge=1)
+    ):
+        self.cursor = cursor
+        self.limit = min(limit, settings.PAGE_SIZE_MAX)
+
+
+def _to_json(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(*values) -> str:
+    payload = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("cursor arity mismatch")
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor - {cursor}") from e
+
+
+def build_page(rows: Sequence, limit: int, cursor_of: Callable[[Any], tuple]) -> dict:
+    """ `rows` is expected to hold up to `limit + 1` rows, the extra one only tells us a next page exists. """
+    items = list(rows[:limit])
+    next_cursor = encode_cursor(*cursor_of(items[-1])) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
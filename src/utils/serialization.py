@@ -0,0 +1,90 @@
+from pydantic import BaseModel, TypeAdapter
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, List, Optional, Type, Union, get_args, get_origin
+import types
+
+from src.utils.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _nested_model(annotation) -> tuple[Optional[Type[BaseModel]], bool]:
+    """ Returns `(model, is_list)` when the annotation is a model, an optional model or a list of models. """
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        for arg in get_args(annotation):
+            if arg is not type(None):
+                return _nested_model(arg)
+    if origin in (list, List):
+        model, _ = _nested_model(get_args(annotation)[0])
+        return model, True
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def _field_plan(model: Type[BaseModel]) -> tuple:
+    plan = []
+    for name, field in model.model_fields.items():
+        if field.exclude:
+            continue
+        nested, is_list = _nested_model(field.annotation)
+        plan.append((name, nested, is_list))
+    return tuple(plan)
+
+
+def to_plain(model: Type[BaseModel], obj: Any) -> Optional[dict]:
+    """
+    Builds the JSON-ready dict of `model` straight from an ORM object or a row mapping, without
+    re-validating trusted database data.
+    """
+    if obj is None:
+        return None
+    get = obj.get if isinstance(obj, Mapping) else lambda name: getattr(obj, name, None)
+    plain = {}
+    for name, nested, is_list in _field_plan(model):
+        value = get(name)
+        if nested is not None and value is not None:
+            value = [to_plain(nested, item) for item in value] if is_list else to_plain(nested, value)
+        plain[name] = value
+    return plain
+
+
+def _fast_enabled() -> bool:
+    return settings.FAST_JSON_RESPONSES and orjson is not None
+
+
+def dump_model(model: Type[BaseModel], obj: Any) -> bytes:
+    if _fast_enabled():
+        return orjson.dumps(to_plain(model, obj), option=orjson.OPT_NON_STR_KEYS)
+    adapter = type_adapter(model)
+    return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+
+def dump_list(model: Type[BaseModel], objs: List[Any]) -> bytes:
+    if _fast_enabled():
+        return orjson.dumps([to_plain(model, obj) for obj in objs], option=orjson.OPT_NON_STR_KEYS)
+    adapter = type_adapter(List[model])
+    return adapter.dump_json(adapter.validate_python(objs, from_attributes=True))
+
+
+def dump_page(model: Type[BaseModel], page: dict) -> bytes:
+    """ `page` is the dict returned by `build_page`. """
+    if _fast_enabled():
+        return orjson.dumps(
+            {"items": [to_plain(model, obj) for obj in page["items"]], "next_cursor": page["next_cursor"]},
+            option=orjson.OPT_NON_STR_KEYS
+        )
+    from src.utils.pagination import Page
+    adapter = type_adapter(Page[model])
+    return adapter.dump_json(adapter.validate_python(page, from_attributes=True))
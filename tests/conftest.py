@@ -0,0 +1,64 @@
+import pytest
+import os
+import tempfile
+
+
+# The app reads its settings from the environment, point it at throwaway backends before `src` is imported.
+TEST_DATABASE = os.path.join(tempfile.gettempdir(), f"secured-server-tests-{os.getpid()}.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{TEST_DATABASE}")
+os.environ.setdefault("JWT_SECRET", "test-secret-with-at-least-32-bytes!")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if os.path.exists(TEST_DATABASE):
+        os.remove(TEST_DATABASE)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def app(anyio_backend):
+    """ The application with its lifespan running, on a fresh SQLite database and an in-memory Redis. """
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from src import app
+    from src.db import redis
+    from src.db.db_agent import get_engine
+    from sqlmodel import SQLModel
+    from src.auth.cache import principal_cache
+    from src.rate_limit import LocalWindows, rate_limiter
+    
+    server = fakeredis.FakeServer()
+    for db in range(4):
+        redis._clients[db] = fakeredis.FakeAsyncRedis(server=server, db=db)
+    async with get_engine().begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    principal_cache.clear()
+    # Local windows and leases outlive the in-memory Redis they were granted by.
+    rate_limiter.local = LocalWindows(rate_limiter.local.max_keys)
+    
+    async with app.router.lifespan_context(app):
+        yield app
+
+
+@pytest.fixture
+async def client(app):
+    import httpx
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def auth_headers(client):
+    """ Bearer header of a freshly signed up user, and that user's uid. """
+    user = dict(username="writer", first_name="Wri", last_name="Ter", email="writer@example.com", password="secret")
+    assert (await client.post("/api/v1/auth/signup", json=user)).status_code == 201
+    login = await client.post("/api/v1/auth/login", json={"email": user["email"], "password": user["password"]})
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}, login.json()["user"]["user_uid"]
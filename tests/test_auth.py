@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.db.db_agent import get_session_maker
+from src.db.models import User
+
+
+pytestmark = pytest.mark.anyio
+
+
+def signup_body(email: str) -> dict:
+    return dict(username="dup", first_name="Du", last_name="Plicate", email=email, password="secret")
+
+
+async def count_users(email: str) -> int:
+    async with get_session_maker()() as session:
+        statement = select(func.count()).select_from(User).where(func.lower(User.email) == email.lower())
+        return (await session.execute(statement)).scalar_one()
+
+
+async def test_duplicate_signup_with_different_case(client):
+    assert (await client.post("/api/v1/auth/signup", json=signup_body("Dup@Example.com"))).status_code == 201
+    
+    response = await client.post("/api/v1/auth/signup", json=signup_body("dup@EXAMPLE.com"))
+    assert response.status_code == 403
+    assert await count_users("dup@example.com") == 1
+
+
+async def test_signup_conflicts_with_mixed_case_row(client):
+    # Rows written before emails were normalized keep their case, the `lower(email)` index still covers them.
+    async with get_session_maker()() as session:
+        session.add(User(username="old", first_name="O", last_name="Ld", email="Legacy@Example.com", password_hash="x"))
+        await session.commit()
+    
+    response = await client.post("/api/v1/auth/signup", json=signup_body("legacy@example.com"))
+    assert response.status_code == 403
+    assert await count_users("legacy@example.com") == 1
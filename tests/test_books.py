@@ -0,0 +1,43 @@
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_books_for_user(client, auth_headers):
+    headers, user_uid = auth_headers
+    book = dict(title="Mine", author="A", publisher="P", published_date="2024-01-01", page_count=1, language="en")
+    assert (await client.post("/api/v1/books/", json=book, headers=headers)).status_code == 201
+    
+    response = await client.get(f"/api/v1/books/user/{user_uid}", headers=headers)
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()["items"]] == ["Mine"]
+
+
+async def test_books_for_user_rejects_malformed_uid(client, auth_headers):
+    headers, _ = auth_headers
+    response = await client.get("/api/v1/books/user/not-a-uuid", headers=headers)
+    assert response.status_code == 422
+
+
+async def test_book_etag_carries_the_row_version(client, auth_headers):
+    headers, _ = auth_headers
+    book = dict(title="Tagged", author="A", publisher="P", published_date="2024-01-01", page_count=1, language="en")
+    book_uid = (await client.post("/api/v1/books/", json=book, headers=headers)).json()["uid"]
+    
+    miss = await client.get(f"/api/v1/books/{book_uid}", headers=headers)
+    hit = await client.get(f"/api/v1/books/{book_uid}", headers=headers)
+    assert miss.headers["etag"] == hit.headers["etag"]
+    assert miss.headers["etag"].startswith('"1.')
+    
+    patch = await client.patch(
+        f"/api/v1/books/{book_uid}", json={"title": "Retagged"}, headers={**headers, "If-Match": hit.headers["etag"]}
+    )
+    assert patch.status_code == 200, patch.text
+    assert patch.headers["etag"].startswith('"2.')
+    
+    stale = await client.patch(
+        f"/api/v1/books/{book_uid}", json={"title": "Lost"}, headers={**headers, "If-Match": hit.headers["etag"]}
+    )
+    assert stale.status_code == 412
+    assert (await client.get(f"/api/v1/books/{book_uid}", headers=headers)).headers["etag"].startswith('"2.')
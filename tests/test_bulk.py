@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from src.books import services
+from src.utils.config import settings
+
+
+pytestmark = pytest.mark.anyio
+
+
+def book(title: str, **overrides) -> dict:
+    return {"title": title, "author": "A", "publisher": "P", "published_date": "2024-01-01", "page_count": 10, "language": "en", **overrides}
+
+
+async def bulk(client, headers, body: str, content_type: str = "application/x-ndjson", **params):
+    response = await client.post(
+        "/api/v1/books/bulk", content=body.encode(), params=params, headers={**headers, "Content-Type": content_type}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def book_titles(client, headers) -> set:
+    response = await client.get("/api/v1/books/", params={"limit": 100}, headers=headers)
+    return {item["title"] for item in response.json()["items"]}
+
+
+async def test_ndjson_import(client, auth_headers):
+    headers, _ = auth_headers
+    body = "\n".join(json.dumps(book(f"Book {i}")) for i in range(5)) + "\n"
+    
+    assert await bulk(client, headers, body) == {"inserted": 5, "failed": 0, "errors": []}
+    assert await book_titles(client, headers) == {f"Book {i}" for i in range(5)}
+
+
+async def test_csv_import(client, auth_headers):
+    headers, _ = auth_headers
+    body = "title,author,publisher,published_date,page_count,language\r\n"
+    body += "".join(f"Csv {i},A,P,2024-01-01,10,en\r\n" for i in range(3))
+    
+    assert await bulk(client, headers, body, content_type="text/csv") == {"inserted": 3, "failed": 0, "errors": []}
+    assert await book_titles(client, headers) == {"Csv 0", "Csv 1", "Csv 2"}
+
+
+async def test_invalid_lines_are_reported_and_skipped(client, auth_headers):
+    headers, _ = auth_headers
+    lines = [
+        json.dumps(book("Good 1")),
+        "{not json",
+        json.dumps(["a", "list"]),
+        "",
+        json.dumps(book("Bad page count", page_count="many")),
+        json.dumps(book("Good 2")),
+    ]
+    result = await bulk(client, headers, "\n".join(lines))
+    
+    assert result["inserted"] == 2
+    assert result["failed"] == 3
+    assert [error["line"] for error in result["errors"]] == [2, 3, 5]
+    assert "page_count" in result["errors"][2]["error"]
+    assert await book_titles(client, headers) == {"Good 1", "Good 2"}
+
+
+async def test_csv_column_count_mismatch(client, auth_headers):
+    headers, _ = auth_headers
+    body = "title,author,publisher,published_date,page_count,language\nShort,A\nFine,A,P,2024-01-01,10,en\n"
+    result = await bulk(client, headers, body, format="csv")
+    
+    assert (result["inserted"], result["failed"]) == (1, 1)
+    assert result["errors"] == [{"line": 2, "error": "expected 6 columns, got 2"}]
+
+
+async def test_failed_chunk_falls_back_to_row_by_row(client, auth_headers, monkeypatch):
+    headers, _ = auth_headers
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 3)
+    build_book_row = services.build_book_row
+    duplicate_uid = []
+    
+    def build_with_duplicate(record, user_uid, now):
+        # Valid records, but "Dup" reuses the primary key of "Orig": only the database rejects it.
+        row = build_book_row(record, user_uid, now)
+        if record["title"] == "Orig":
+            duplicate_uid.append(row["uid"])
+        if record["title"] == "Dup":
+            row["uid"] = duplicate_uid[0]
+        return row
+    
+    monkeypatch.setattr(services, "build_book_row", build_with_duplicate)
+    titles = ["Orig", "Before", "Dup", "After 1", "After 2"]
+    result = await bulk(client, headers, "\n".join(json.dumps(book(title)) for title in titles))
+    
+    assert (result["inserted"], result["failed"]) == (4, 1)
+    assert [error["line"] for error in result["errors"]] == [3]
+    assert await book_titles(client, headers) == {"Orig", "Before", "After 1", "After 2"}
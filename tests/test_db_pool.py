@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import text
+
+from src.db import db_agent
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def engines(monkeypatch, tmp_path):
+    pytest.importorskip("aiosqlite")
+    monkeypatch.setattr(db_agent, "_engines", {})
+    monkeypatch.setattr(db_agent, "_pool_stats", {})
+    primary = db_agent.build_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}", "primary")
+    replica = db_agent.build_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", "replica0")
+    return primary, replica
+
+
+async def test_pool_metrics_per_engine(engines):
+    primary, replica = engines
+    for _ in range(3):
+        async with replica.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    async with primary.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        metrics = db_agent.pool_metrics()
+    
+    assert set(metrics) == {"primary", "replica0"}
+    assert metrics["primary"]["checkouts"] == 1
+    assert metrics["primary"]["checked_out"] == 1
+    assert metrics["replica0"]["checkouts"] == 3
+    assert metrics["replica0"]["checked_out"] == 0
+    
+    # `dispose()` replaces the pool, its stats carry over.
+    await replica.dispose()
+    await primary.dispose()
+    assert db_agent.pool_metrics()["replica0"]["checkouts"] == 3
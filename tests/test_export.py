@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+
+import pytest
+
+from src.books.schemas import BooksModel
+from src.utils.config import settings
+
+
+pytestmark = pytest.mark.anyio
+
+BOOKS = 5
+
+
+@pytest.fixture
+async def headers(client, auth_headers, monkeypatch):
+    headers, _ = auth_headers
+    # Several batches, so the stream is assembled from more than one chunk.
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    for i in range(BOOKS):
+        book = dict(title=f"Book {i}", author="A, B", publisher="P", published_date="2024-01-01", page_count=i + 1, language="en")
+        assert (await client.post("/api/v1/books/", json=book, headers=headers)).status_code == 201
+    return headers
+
+
+async def export(client, headers, **params):
+    response = await client.get("/api/v1/books/export", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+async def test_csv_export(client, headers):
+    response = await export(client, headers, format="csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="books.csv"' in response.headers["content-disposition"]
+    
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == list(BooksModel.model_fields)
+    records = [dict(zip(rows[0], row)) for row in rows[1:]]
+    assert sorted(record["title"] for record in records) == [f"Book {i}" for i in range(BOOKS)]
+    assert {record["author"] for record in records} == {"A, B"}
+
+
+async def test_ndjson_export(client, headers):
+    response = await export(client, headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    lines = response.text.splitlines()
+    assert len(lines) == BOOKS
+    records = [json.loads(line) for line in lines]
+    assert set(records[0]) == set(BooksModel.model_fields)
+    assert sorted(record["page_count"] for record in records) == list(range(1, BOOKS + 1))
+
+
+async def test_export_of_user_without_books(client, headers):
+    user_uid = "00000000-0000-0000-0000-000000000000"
+    assert (await export(client, headers, format="ndjson", user_uid=user_uid)).text == ""
+    csv_rows = list(csv.reader(io.StringIO((await export(client, headers, format="csv", user_uid=user_uid)).text)))
+    assert csv_rows == [list(BooksModel.model_fields)]
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from src.metrics import REQUESTS_TOTAL
+from src.middelware import TelemetryMiddleware
+
+
+pytestmark = pytest.mark.anyio
+
+
+def routes_seen(method: str) -> set:
+    return {route for (seen_method, route, _) in REQUESTS_TOTAL.values if seen_method == method}
+
+
+async def test_route_labels_keep_the_router_prefix(client):
+    await client.get("/")
+    await client.get("/api/v1/books/")
+    await client.get("/api/v1/books/00000000-0000-0000-0000-000000000000")
+    
+    assert {"/", "/api/v1/books/", "/api/v1/books/{book_id}"} <= routes_seen("GET")
+
+
+async def test_router_included_twice_gets_one_label_per_prefix():
+    router = APIRouter()
+    
+    @router.delete("/{item_id}")
+    async def remove(item_id: str):
+        return {}
+    
+    app = FastAPI()
+    app.include_router(router, prefix="/first")
+    app.include_router(router, prefix="/second/nested")
+    app.add_middleware(TelemetryMiddleware, sample_rate=0.0, slow_request_seconds=60)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.delete("/first/1")
+        await client.delete("/second/nested/2")
+    
+    assert {"/first/{item_id}", "/second/nested/{item_id}"} <= routes_seen("DELETE")
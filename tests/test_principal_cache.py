@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.auth.cache import principal_cache, publish_eviction
+from src.auth.schemas import Principal
+from src.db.db_agent import get_session_maker
+from src.db.models import User
+from src.db.redis import blocklist_mirror
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def cache_principal(user_uid: str):
+    principal_cache.set(user_uid, Principal(uid=uuid.UUID(user_uid), email="p@example.com", role="user", is_verified=True))
+
+
+async def test_eviction_from_another_worker(app):
+    await wait_for(lambda: blocklist_mirror.ready)
+    user_uid = str(uuid.uuid4())
+    cache_principal(user_uid)
+    
+    await publish_eviction(user_uid)
+    await wait_for(lambda: principal_cache.get(user_uid) is None)
+
+
+async def test_role_change_is_published_after_commit(app, monkeypatch):
+    published = []
+    
+    async def publish(user_uid: str):
+        published.append(user_uid)
+    
+    monkeypatch.setattr("src.auth.cache.publish_eviction", publish)
+    
+    async with get_session_maker()() as session:
+        user = User(username="role", first_name="Ro", last_name="Le", email="role@example.com", password_hash="x")
+        session.add(user)
+        await session.commit()
+        user_uid = str(user.uid)
+        cache_principal(user_uid)
+        
+        user.role = "admin"
+        await session.flush()
+        assert principal_cache.get(user_uid) is None
+        assert published == []
+        
+        await session.commit()
+    await wait_for(lambda: published == [user_uid])
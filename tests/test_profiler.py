@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.profiler import QueryProfiler
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_statements_leave_no_start_time():
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    profiler = QueryProfiler(slow_seconds=60, slow_sample_rate=0, max_statements=10)
+    profiler.attach(engine)
+    
+    async with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                await conn.execute(text("SELECT * FROM missing"))
+        await conn.execute(text("SELECT 1"))
+        
+        assert conn.sync_connection.info["query_start_time"] == []
+    await engine.dispose()
+    
+    assert profiler.stats()["failed_queries"] == 3
+    assert profiler.stats()["queries"] == 1
@@ -0,0 +1,80 @@
+"""
+Statements issued per request on the main read endpoints. The counts must not depend on how many
+books or reviews there are: a relationship loaded per row (N+1) makes these tests fail.
+"""
+import pytest
+
+from src.db.profiler import query_profiler
+
+
+pytestmark = pytest.mark.anyio
+
+BOOKS = 6
+REVIEWS_PER_BOOK = 3
+
+
+@pytest.fixture(autouse=True)
+def uncached_responses(monkeypatch):
+    from src.db.cache import response_cache
+    monkeypatch.setattr(response_cache, "enabled", False)
+
+
+async def count_queries(client, url: str, headers: dict):
+    before = query_profiler.queries
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return response, query_profiler.queries - before
+
+
+@pytest.fixture
+async def seeded(client):
+    user = dict(username="reader", first_name="Re", last_name="Ader", email="reader@example.com", password="secret")
+    assert (await client.post("/api/v1/auth/signup", json=user)).status_code == 201
+    login = await client.post("/api/v1/auth/login", json={"email": user["email"], "password": user["password"]})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    
+    book_uids = []
+    for i in range(BOOKS):
+        book = dict(
+            title=f"Book {i}", author="Author", publisher="Press", published_date="2024-01-01",
+            page_count=100 + i, language="en"
+        )
+        response = await client.post("/api/v1/books/", json=book, headers=headers)
+        assert response.status_code == 201, response.text
+        book_uids.append(response.json()["uid"])
+        for rating in range(1, REVIEWS_PER_BOOK + 1):
+            review = await client.post(f"/api/v1/reviews/book/{book_uids[-1]}", json={"rating": rating, "review_text": "ok"}, headers=headers)
+            assert review.status_code == 200, review.text
+    
+    # Warm the principal cache, the counts below are the steady state of an authenticated client.
+    await client.get("/api/v1/auth/me", headers=headers)
+    return headers, book_uids
+
+
+async def test_me_with_books_and_reviews(client, seeded):
+    headers, _ = seeded
+    response, queries = await count_queries(client, "/api/v1/auth/me", headers)
+    assert len(response.json()["books"]) == BOOKS
+    assert queries == 3
+
+
+async def test_books_page(client, seeded):
+    headers, _ = seeded
+    response, queries = await count_queries(client, "/api/v1/books/", headers)
+    assert len(response.json()["items"]) == BOOKS
+    assert queries == 1
+
+
+async def test_book_detail_with_reviews(client, seeded):
+    headers, book_uids = seeded
+    response, queries = await count_queries(client, f"/api/v1/books/{book_uids[0]}", headers)
+    assert len(response.json()["reviews"]) == REVIEWS_PER_BOOK
+    # The book, then its reviews and its rating summary each in one `selectin` query.
+    assert queries == 3
+
+
+async def test_book_detail_without_reviews(client, seeded):
+    headers, book_uids = seeded
+    response, queries = await count_queries(client, f"/api/v1/books/{book_uids[0]}?include_reviews=false", headers)
+    assert response.json()["rating_summary"]["review_count"] == REVIEWS_PER_BOOK
+    assert queries == 2
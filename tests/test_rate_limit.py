@@ -0,0 +1,120 @@
+import itertools
+import math
+
+import pytest
+
+from src.db.redis import CircuitBreaker
+from src.exceptions import RateLimited
+from src.rate_limit import LimitState, LocalWindows, RateLimiter, parse_limit
+
+
+def sliding_count(window: int, elapsed: float, current: int, previous: int, later: float) -> float:
+    """ Weighted count `later` seconds from now, with no hits in between. """
+    position = elapsed + later
+    if position < window:
+        return previous * (window - position) / window + current
+    if position < 2 * window:
+        return current * (2 * window - position) / window
+    return 0.0
+
+
+def test_parse_limit():
+    assert parse_limit("10/minute") == (10, 60)
+    assert parse_limit("20 / hour") == (20, 3600)
+    assert parse_limit("") is None
+
+
+def test_retry_after_waits_for_current_window_to_drain_in_the_next_one():
+    state = LimitState(limit=3, window=60, elapsed=58, current=3, previous=0)
+    assert state.remaining == 0
+    # At the reset the 3 hits still weigh 3.0, they drop to 2.0 20s into the next window.
+    assert state.reset == 2
+    assert state.retry_after == 22
+
+
+def test_retry_after_while_previous_window_drains():
+    state = LimitState(limit=10, window=60, elapsed=30, current=4, previous=12)
+    # 12 * 30 / 60 + 4 = 10 used, a hit fits once 12 * (60 - e) / 60 + 4 <= 9, at e = 35.
+    assert state.retry_after == 5
+
+
+@pytest.mark.parametrize("limit, window", [(1, 1), (3, 60), (10, 60), (100, 3600)])
+def test_retry_after_is_the_first_second_a_hit_is_allowed(limit, window):
+    for elapsed, current, previous in itertools.product(
+        [0, 0.5, window / 3, window - 1],
+        range(0, limit + 2),
+        [0, 1, limit // 2, limit, limit * 2],
+    ):
+        state = LimitState(limit, window, elapsed, current, previous)
+        if state.used + 1 <= limit:
+            continue
+        assert sliding_count(window, elapsed, current, previous, state.retry_after) + 1 <= limit + 1e-9
+        if state.retry_after > 1:
+            assert sliding_count(window, elapsed, current, previous, state.retry_after - 1) + 1 > limit
+
+
+def test_local_windows_roll_over_and_remember_denials():
+    local = LocalWindows(max_keys=2)
+    for _ in range(3):
+        local.hit("k", window=60, now=10)
+    state, denied_until = local.state("k", limit=3, window=60, now=70)
+    assert (state.used, denied_until) == (3 * 50 / 60, 0.0)
+    
+    local.deny("k", window=60, now=70, until=80)
+    assert local.state("k", limit=3, window=60, now=75)[1] == 80
+
+
+def test_local_windows_are_bounded():
+    local = LocalWindows(max_keys=2)
+    for key in "abc":
+        local.hit(key, window=60, now=0)
+    assert len(local) == 2
+    assert math.isclose(local.state("a", limit=5, window=60, now=0)[0].used, 0)
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis()
+
+
+def limiter(client, limit: str, lease_fraction: float) -> RateLimiter:
+    return RateLimiter(
+        client=lambda: client, rules={"write": {"uid": parse_limit(limit)}},
+        timeout=1.0, lease_fraction=lease_fraction, breaker=CircuitBreaker("test", 5, 5.0)
+    )
+
+
+async def hit_until_denied(limiters: list, attempts: int) -> int:
+    allowed = 0
+    for i in range(attempts):
+        try:
+            await limiters[i % len(limiters)].hit("write", {"uid": "u"})
+            allowed += 1
+        except RateLimited:
+            pass
+    return allowed
+
+
+@pytest.mark.anyio
+async def test_leased_permits_skip_redis(redis_client):
+    rate_limiter = limiter(redis_client, "100/hour", lease_fraction=0.1)
+    headers = [await rate_limiter.hit("write", {"uid": "u"}) for _ in range(20)]
+    # One round-trip leases 10 permits, the other 9 hits of each lease are spent in process.
+    assert rate_limiter.leased == 18
+    assert [h["RateLimit-Remaining"] for h in headers[:3]] == ["99", "98", "97"]
+    assert headers[-1]["RateLimit-Remaining"] == "80"
+
+
+@pytest.mark.anyio
+async def test_leases_never_exceed_the_limit_across_workers(redis_client):
+    workers = [limiter(redis_client, "10/hour", lease_fraction=0.3) for _ in range(3)]
+    assert await hit_until_denied(workers, attempts=30) <= 10
+
+
+@pytest.mark.anyio
+async def test_without_leases_every_hit_is_checked(redis_client):
+    rate_limiter = limiter(redis_client, "10/hour", lease_fraction=0)
+    assert await hit_until_denied([rate_limiter], attempts=15) == 10
+    assert rate_limiter.leased == 0
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.db.db_agent import get_session_maker
+from src.db.models import BookRatingSummary, Reviews
+
+
+pytestmark = pytest.mark.anyio
+
+MISSING_BOOK = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.fixture
+async def book_uid(client, auth_headers):
+    headers, _ = auth_headers
+    book = dict(title="Reviewed", author="A", publisher="P", published_date="2024-01-01", page_count=1, language="en")
+    response = await client.post("/api/v1/books/", json=book, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["uid"]
+
+
+async def review(client, headers, book_uid: str, rating: int):
+    return await client.post(f"/api/v1/reviews/book/{book_uid}", json={"rating": rating, "review_text": "ok"}, headers=headers)
+
+
+async def test_review_of_missing_book(client, auth_headers):
+    headers, _ = auth_headers
+    response = await review(client, headers, MISSING_BOOK, 4)
+    
+    assert response.status_code == 404
+    async with get_session_maker()() as session:
+        assert (await session.execute(select(func.count()).select_from(Reviews))).scalar_one() == 0
+        assert (await session.execute(select(func.count()).select_from(BookRatingSummary))).scalar_one() == 0
+
+
+async def test_reviews_update_the_rating_summary(client, auth_headers, book_uid):
+    headers, _ = auth_headers
+    for rating in (5, 5, 3, 0):
+        response = await review(client, headers, book_uid, rating)
+        assert response.status_code == 200, response.text
+        assert response.json()["book_uid"] == book_uid
+    
+    async with get_session_maker()() as session:
+        summary = (await session.execute(select(BookRatingSummary))).scalar_one()
+    assert str(summary.book_uid) == book_uid
+    assert (summary.review_count, summary.rating_sum) == (4, 13)
+    assert summary.histogram == {0: 1, 1: 0, 2: 0, 3: 1, 4: 0, 5: 2}
+
+
+async def test_book_stats(client, auth_headers, book_uid):
+    headers, _ = auth_headers
+    stats = await client.get(f"/api/v1/books/{book_uid}/stats", headers=headers)
+    assert stats.status_code == 200
+    assert stats.json() == {"review_count": 0, "rating_sum": 0, "average_rating": 0.0, "histogram": {str(r): 0 for r in range(6)}}
+    
+    for rating in (4, 1):
+        assert (await review(client, headers, book_uid, rating)).status_code == 200
+    stats = await client.get(f"/api/v1/books/{book_uid}/stats", headers=headers)
+    assert stats.json()["review_count"] == 2 and stats.json()["average_rating"] == 2.5
+    assert stats.json()["histogram"] == {"0": 0, "1": 1, "2": 0, "3": 0, "4": 1, "5": 0}
+    
+    assert (await client.get(f"/api/v1/books/{MISSING_BOOK}/stats", headers=headers)).status_code == 404
+
+
+async def test_deleted_book_drops_its_stats(client, auth_headers, book_uid):
+    headers, _ = auth_headers
+    assert (await review(client, headers, book_uid, 3)).status_code == 200
+    assert (await client.delete(f"/api/v1/books/{book_uid}", headers=headers)).status_code == 204
+    
+    assert (await client.get(f"/api/v1/books/{book_uid}/stats", headers=headers)).status_code == 404
+    async with get_session_maker()() as session:
+        assert (await session.execute(select(func.count()).select_from(BookRatingSummary))).scalar_one() == 0
+        # Reviews outlive their book, detached by `ON DELETE SET NULL`.
+        assert (await session.execute(select(Reviews.book_uid))).scalars().all() == [None]
+
+
+@pytest.mark.parametrize("sort, expected", [("rating", [5, 4, 3, 2, 1]), ("recent", [2, 5, 1, 4, 3])])
+async def test_reviews_pages(client, auth_headers, book_uid, sort, expected):
+    headers, _ = auth_headers
+    for rating in (3, 4, 1, 5, 2):
+        assert (await review(client, headers, book_uid, rating)).status_code == 200
+    
+    ratings, cursor = [], None
+    for _ in range(3):
+        params = {"sort": sort, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = await client.get(f"/api/v1/reviews/book/{book_uid}", params=params, headers=headers)
+        assert page.status_code == 200, page.text
+        ratings += [item["rating"] for item in page.json()["items"]]
+        cursor = page.json()["next_cursor"]
+    assert ratings == expected
+    assert cursor is None
+    
+    invalid = await client.get(f"/api/v1/reviews/book/{book_uid}", params={"sort": sort, "cursor": "garbage"}, headers=headers)
+    assert invalid.status_code == 400
@@ -0,0 +1,42 @@
+import os
+import pytest
+
+
+# PostgreSQL ranks with full-text search, these cover the `LIKE` fallback of every other dialect.
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(os.environ["DATABASE_URL"].startswith("postgresql"), reason="full-text search on PostgreSQL"),
+]
+
+
+@pytest.fixture
+async def headers(client, auth_headers):
+    headers, _ = auth_headers
+    for title, author in [
+        ("Python Basics", "Ada Lovelace"), ("Advanced Python", "Guido Rossum"),
+        ("Cloud Patterns", "Ada Lovelace"), ("snake_case Style", "Someone"),
+    ]:
+        book = dict(title=title, author=author, publisher="P", published_date="2024-01-01", page_count=1, language="en")
+        assert (await client.post("/api/v1/books/", json=book, headers=headers)).status_code == 201
+    return headers
+
+
+async def search(client, headers, **params):
+    response = await client.get("/api/v1/books/search", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_like_fallback_matches_every_term_in_title_or_author(client, headers):
+    assert {book["title"] for book in (await search(client, headers, q="pyth"))["items"]} == {"Python Basics", "Advanced Python"}
+    assert [book["title"] for book in (await search(client, headers, q="ada PYTHON"))["items"]] == ["Python Basics"]
+    assert (await search(client, headers, q="nothing"))["items"] == []
+    # `_` is matched literally, not as a LIKE wildcard.
+    assert [book["title"] for book in (await search(client, headers, q="e_c"))["items"]] == ["snake_case Style"]
+
+
+async def test_like_fallback_pages(client, headers):
+    first = await search(client, headers, q="ada", limit=1)
+    second = await search(client, headers, q="ada", limit=1, cursor=first["next_cursor"])
+    assert first["next_cursor"] and second["next_cursor"] is None
+    assert {first["items"][0]["title"], second["items"][0]["title"]} == {"Python Basics", "Cloud Patterns"}